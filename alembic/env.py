@@ -17,6 +17,7 @@ from apps.notification.models import (
     Notification,
     NotificationTypeChoices,
     UserNotification,
+    UserNotificationState,
 )
 from apps.stock.models import Stock, StockHistory
 
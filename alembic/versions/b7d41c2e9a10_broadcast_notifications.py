@@ -0,0 +1,78 @@
+"""broadcast notifications (fan-out-on-read)
+
+Revision ID: b7d41c2e9a10
+Revises: 0a68902e3794
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d41c2e9a10"
+down_revision: Union[str, Sequence[str], None] = "0a68902e3794"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "notifications",
+        sa.Column(
+            "is_broadcast", sa.Boolean(), server_default=sa.false(), nullable=False
+        ),
+    )
+    op.create_index(
+        "ix_notifications_broadcast_id",
+        "notifications",
+        ["id"],
+        unique=False,
+        postgresql_where=sa.text("is_broadcast"),
+        sqlite_where=sa.text("is_broadcast"),
+    )
+    op.create_index(
+        "uq_user_notifications_user_notification",
+        "user_notifications",
+        ["user_id", "notification_id"],
+        unique=True,
+    )
+    op.create_table(
+        "user_notification_states",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "last_seen_broadcast_id",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+        ),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+        sa.Column("updated_by", sa.Integer(), nullable=True),
+        sa.Column("created_by", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_notification_states")
+    op.drop_index(
+        "uq_user_notifications_user_notification", table_name="user_notifications"
+    )
+    op.drop_index("ix_notifications_broadcast_id", table_name="notifications")
+    op.drop_column("notifications", "is_broadcast")
@@ -0,0 +1,39 @@
+"""notification unread counters
+
+Revision ID: c3e8f5a1d2b7
+Revises: b7d41c2e9a10
+Create Date: 2026-10-18 18:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e8f5a1d2b7"
+down_revision: Union[str, Sequence[str], None] = "b7d41c2e9a10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "user_notification_states",
+        sa.Column("unread_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "user_notification_states",
+        sa.Column(
+            "broadcast_read_count", sa.Integer(), server_default="0", nullable=False
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("user_notification_states", "broadcast_read_count")
+    op.drop_column("user_notification_states", "unread_count")
@@ -0,0 +1,32 @@
+"""stock history (stock_id, created_at) index
+
+Revision ID: d9a2b6c4e8f1
+Revises: c3e8f5a1d2b7
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d9a2b6c4e8f1"
+down_revision: Union[str, Sequence[str], None] = "c3e8f5a1d2b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_stock_history_stock_id_created_at",
+        "stock_history",
+        ["stock_id", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_stock_history_stock_id_created_at", table_name="stock_history")
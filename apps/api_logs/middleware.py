@@ -1,14 +1,17 @@
 import json
 import logging
 import traceback
-from typing import Callable
+from typing import Any
 
-from fastapi import Request, Response
-from sqlalchemy.orm import Session
-from starlette.middleware.base import BaseHTTPMiddleware
+from decouple import config
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from apps.api_logs.models import APILog, ErrorLog
-from apps.database import SessionLocal
+from apps.api_logs.sink import api_log_sink
+from apps.metrics.queries import check_request_queries
+from apps.metrics.timing import start_request_timing
 
 logger = logging.getLogger(__name__)
 # class APILoggingMiddleware(BaseHTTPMiddleware):
@@ -54,78 +57,129 @@ logger = logging.getLogger(__name__)
 #         return
 
 
-class APILoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response_body = b""
+class APILoggingMiddleware:
+    """
+    Pure ASGI API logger.
+
+    Request/response messages are tapped as they pass through instead of
+    buffering the whole response: only the first `max_body_size` bytes of each
+    body are kept for the log, and every message (including streaming bodies)
+    is forwarded to the server unchanged.
+
+    Also starts the request's timings (apps.metrics.timing): they are sent as
+    a Server-Timing header and stored in APILog.system_details.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_body_size: int = config("API_LOG_MAX_BODY_SIZE", default=10_240, cast=int),
+    ):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Skip body capture (and APILog rows) for GET requests
+        capture = scope["method"].upper() != "GET"
+        request_body = _BodyPrefix(self.max_body_size)
+        response_body = _BodyPrefix(self.max_body_size)
         response_status = 500
-        response_headers = {}
-        response_media_type = "application/json"
-        body = None
-        db: Session = SessionLocal()  # Create a new database session directly.
-        # We are not using `next(get_db())` here because `get_db()` is a generator
-        # designed for FastAPI dependencies (`Depends`). Middleware does not handle
-        # generators automatically, so we manually manage the session lifecycle.
+        response_started = False
+        timings = start_request_timing()
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if capture and message["type"] == "http.request":
+                request_body.feed(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_status, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                response_status = message["status"]
+                if timings is not None:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", timings.server_timing().encode()),
+                    ]
+            elif capture and message["type"] == "http.response.body":
+                response_body.feed(message.get("body", b""))
+            await send(message)
+
         try:
-            # Skip GET requests
-            if request.method.upper() != "GET":
-                # Read request body
-                try:
-                    body = await request.json()
-                except Exception:
-                    body = None
-            # Get response
-            response = await call_next(request)
-            # Read response body safely
-            async for chunk in response.body_iterator:
-                response_body += chunk
-            # Convert response to string for logging
-            try:
-                response_content = json.dumps(json.loads(response_body.decode()))
-            except Exception:
-                response_content = response_body.decode()
-            # Save metadata
-            response_status = response.status_code
-            response_headers = dict(response.headers)
-            response_media_type = response.media_type
-            # Log API call
-            if request.method.upper() != "GET":
-                api_log = APILog(
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception as exc:
+            request = Request(scope)
+            await api_log_sink.enqueue(
+                ErrorLog,
+                dict(
+                    url=str(request.url),
+                    method=request.method.lower(),
+                    body=request_body.value(json_only=True),
+                    header=dict(request.headers),
+                    response="".join(
+                        traceback.format_exception(type(exc), exc, exc.__traceback__)
+                    ),
+                    system_details=timings.as_dict() if timings else None,
+                ),
+            )
+            if response_started:
+                # Headers are already on the wire; nothing sane left to send.
+                raise
+            response = JSONResponse(status_code=500, content={"detail": str(exc)})
+            await response(scope, receive, send)
+            return
+
+        if capture:
+            request = Request(scope)
+            await api_log_sink.enqueue(
+                APILog,
+                dict(
                     url=str(request.url),
                     method=request.method,
                     ip=request.client.host if request.client else None,
                     user_agent=request.headers.get("user-agent"),
-                    body=body,
+                    body=request_body.value(json_only=True),
                     header=dict(request.headers),
-                    response=response_content,
+                    response=response_body.value(),
                     status_code=str(response_status),
-                )
-                db.add(api_log)
-                db.commit()
-        except Exception as exc:
-            # Log errors
-            error_log = ErrorLog(
-                url=str(request.url),
-                method=request.method.lower(),
-                body=body if "body" in locals() else None,
-                header=dict(request.headers),
-                response="".join(
-                    traceback.format_exception(type(exc), exc, exc.__traceback__)
+                    system_details=timings.as_dict() if timings else None,
                 ),
             )
-            db.add(error_log)
-            db.commit()
-            # Override response with error
-            response_body = json.dumps({"detail": str(exc)}).encode()
-            response_status = 500
-            response_headers = {"content-type": "application/json"}
-            response_media_type = "application/json"
-        finally:
-            db.close()  # Ensure DB session is closed
-
-        # Return the original response content safely
-        return Response(
-            content=response_body,
-            status_code=response_status,
-            headers=response_headers,
-            media_type=response_media_type,
-        )
+        # debug-mode query guard; in strict mode it raises past the response
+        check_request_queries(timings, scope)
+
+
+class _BodyPrefix:
+    """Keeps at most `limit` bytes of a streamed body."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.buffer = bytearray()
+        self.truncated = False
+
+    def feed(self, chunk: bytes) -> None:
+        room = self.limit - len(self.buffer)
+        if len(chunk) > room:
+            self.truncated = True
+        if room > 0:
+            self.buffer += chunk[:room]
+
+    def value(self, json_only: bool = False) -> Any:
+        """Parsed JSON when the whole body was captured, else a text prefix."""
+        if not self.buffer:
+            return None
+        if not self.truncated:
+            try:
+                return json.loads(self.buffer)
+            except ValueError:
+                pass
+        if json_only:
+            return None
+        text = self.buffer.decode(errors="replace")
+        return text + "...[truncated]" if self.truncated else text
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, status
 from fastapi.responses import JSONResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from apps.authentication.authentication import Principal, require_superuser
 from apps.database import get_db
-from base.pagination import get_pagination_params, paginate
-from base.route import StandardResponse
+from base.conditional import get_validator, row_state
+from base.count import CountStrategy
+from base.export import ExportParams, export_response, filter_created, get_export_params
+from base.pagination import get_pagination_params, get_schema_columns, paginate
+from base.route import StandardJSONResponse, StandardResponse
 
-from .models import APILog, ErrorLog
+from .models import APILog, ErrorLog, HTTPMethod
 from .schemas import APILogList, APILogRetrieve, ErrorLogList, ErrorLogRetrieve
 
 router = APIRouter()
@@ -27,25 +32,80 @@ def list_api_logs(
         schema=APILogList,
         pagination=pagination,
         # pagination=Depends(get_pagination_params),
+        keyset=(APILog.created_at, APILog.id),
+        descending=True,
+        count_strategy=CountStrategy.ESTIMATED,
+        as_rows=True,
     )
 
-    return JSONResponse(
+    return StandardJSONResponse(
         status_code=status.HTTP_200_OK,
         content=StandardResponse.success_response(
             data=result.data,
             message="API logs fetched successfully.",
             meta=result.meta,
-        ).model_dump(mode="json"),
+        ),
     )
 
 
+@router.get("/export")
+def export_api_logs(
+    params: ExportParams = Depends(get_export_params),
+    current_user: Principal = Depends(require_superuser),
+):
+    """Stream API logs as CSV or NDJSON, newest first"""
+    query = select(*get_schema_columns(APILog, APILogList)).order_by(
+        APILog.created_at.desc(), APILog.id.desc()
+    )
+    query = filter_created(query, APILog.created_at, params)
+    if params.status_code is not None:
+        query = query.where(APILog.status_code == params.status_code)
+    if params.method is not None:
+        query = query.where(APILog.method == params.method.upper())
+    return export_response(query, params.format, "api_logs")
+
+
+@router.get("/error-logs/export")
+def export_error_logs(
+    params: ExportParams = Depends(get_export_params),
+    current_user: Principal = Depends(require_superuser),
+):
+    """Stream error logs as CSV or NDJSON, newest first"""
+    query = select(*get_schema_columns(ErrorLog, ErrorLogList)).order_by(
+        ErrorLog.created_at.desc(), ErrorLog.id.desc()
+    )
+    query = filter_created(query, ErrorLog.created_at, params)
+    if params.status_code is not None:
+        query = query.where(ErrorLog.status_code == params.status_code)
+    if params.method is not None:
+        try:
+            method = HTTPMethod(params.method.lower())
+        except ValueError:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content=StandardResponse.error_response(
+                    message=f"Unknown method: {params.method}."
+                ).model_dump(),
+            )
+        query = query.where(ErrorLog.method == method)
+    return export_response(query, params.format, "error_logs")
+
+
 @router.get("/retrieve/{log_id}", response_model=StandardResponse)
 def retrieve_api_logs(
     log_id: int,
+    request: Request,
     db: Session = Depends(get_db),
 ):
     """Retrieve a specific API log by ID"""
-    result = db.query(APILog).filter(APILog.id == log_id).first()
+    # logs are written once: polling clients get 304s off the primary key
+    validator = get_validator(db, row_state(APILog, log_id), request)
+    if validator is None:
+        result = None
+    elif validator.matches(request):
+        return validator.not_modified()
+    else:
+        result = db.query(APILog).filter(APILog.id == log_id).first()
     if not result:
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -54,13 +114,15 @@ def retrieve_api_logs(
             ).model_dump(),
         )
 
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=StandardResponse.success_response(
-            data=APILogRetrieve.model_validate(result),
-            message="API logs retrieved successfully.",
-            # meta=result.meta,
-        ).model_dump(),
+    return validator.apply(
+        JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=StandardResponse.success_response(
+                data=APILogRetrieve.model_validate(result),
+                message="API logs retrieved successfully.",
+                # meta=result.meta,
+            ).model_dump(),
+        )
     )
 
 
@@ -78,6 +140,10 @@ def list_error_logs(
         # page_size=page_size,
         pagination=pagination,
         schema=ErrorLogList,
+        keyset=(ErrorLog.created_at, ErrorLog.id),
+        descending=True,
+        count_strategy=CountStrategy.ESTIMATED,
+        as_rows=True,
     )
     if not result.data:
         return JSONResponse(
@@ -87,23 +153,30 @@ def list_error_logs(
             ).model_dump(),
         )
 
-    return JSONResponse(
+    return StandardJSONResponse(
         status_code=status.HTTP_200_OK,
         content=StandardResponse.success_response(
             data=result.data,
             message="Error logs fetched successfully.",
             meta=result.meta,  # to show pagination meta in response
-        ).model_dump(mode="json"),
+        ),
     )
 
 
 @router.get("/error-logs/{log_id}", response_model=StandardResponse)
 def retrieve_error_log(
     log_id: int,
+    request: Request,
     db: Session = Depends(get_db),
 ):
     """Retrieve a specific error log by ID"""
-    result = db.query(ErrorLog).filter(ErrorLog.id == log_id).first()
+    validator = get_validator(db, row_state(ErrorLog, log_id), request)
+    if validator is None:
+        result = None
+    elif validator.matches(request):
+        return validator.not_modified()
+    else:
+        result = db.query(ErrorLog).filter(ErrorLog.id == log_id).first()
     if not result:
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -112,10 +185,12 @@ def retrieve_error_log(
             ).model_dump(),
         )
 
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=StandardResponse.success_response(
-            data=ErrorLogRetrieve.model_validate(result),
-            message="Error log retrieved successfully.",
-        ).model_dump(mode="json"),
+    return validator.apply(
+        JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=StandardResponse.success_response(
+                data=ErrorLogRetrieve.model_validate(result),
+                message="Error log retrieved successfully.",
+            ).model_dump(mode="json"),
+        )
     )
@@ -0,0 +1,174 @@
+import asyncio
+import enum
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from decouple import config
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+
+from apps.database import Base, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+LogRecord = Tuple[Type[Base], Dict[str, Any]]
+
+_STOP = object()  # queued by stop() so the writer flushes its batch and exits
+
+
+class BackpressurePolicy(str, enum.Enum):
+    DROP = "drop"  # drop new records once the queue is full
+    SAMPLE = "sample"  # keep a fraction of records once the queue is half full
+    BLOCK = "block"  # wait (up to block_timeout) for room in the queue
+
+
+class APILogSink:
+    """
+    Bounded in-process queue for APILog/ErrorLog rows.
+
+    The middleware only pushes plain dicts onto the queue; a background task
+    drains it and bulk-inserts batches with a single executemany per model, so
+    no request ever waits on an INSERT + COMMIT.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        policy: BackpressurePolicy = BackpressurePolicy.DROP,
+        sample_rate: float = 0.1,
+        block_timeout: float = 0.5,
+    ):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = BackpressurePolicy(policy)
+        self.sample_rate = sample_rate
+        self.block_timeout = block_timeout
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "enqueued": 0,
+            "dropped": 0,
+            "sampled_out": 0,
+            "written": 0,
+            "failed": 0,
+            "batches": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run(), name="api-log-sink")
+
+    async def stop(self) -> None:
+        """Stop the writer and flush everything still queued."""
+        if self._task is None:
+            return
+        if not self._task.done():
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+
+    async def enqueue(self, model: Type[Base], values: Dict[str, Any]) -> bool:
+        """Queue one row for `model`. Returns False when the row was not kept."""
+        record = (model, values)
+
+        if not self.running:
+            # No lifespan (scripts, ad-hoc apps): fall back to a direct write
+            # off the event loop instead of losing the row.
+            await run_in_threadpool(self._write_batch, [record])
+            return True
+
+        queue = self._queue
+        if self.policy == BackpressurePolicy.SAMPLE and (
+            queue.qsize() >= self.max_queue_size // 2
+        ):
+            if random.random() >= self.sample_rate:
+                self._stats["sampled_out"] += 1
+                return False
+
+        if self.policy == BackpressurePolicy.BLOCK:
+            try:
+                await asyncio.wait_for(queue.put(record), timeout=self.block_timeout)
+            except asyncio.TimeoutError:
+                self._stats["dropped"] += 1
+                return False
+        else:
+            try:
+                queue.put_nowait(record)
+            except asyncio.QueueFull:
+                self._stats["dropped"] += 1
+                return False
+
+        self._stats["enqueued"] += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "policy": self.policy.value,
+        }
+
+    async def _run(self) -> None:
+        queue = self._queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is _STOP:
+                break
+            batch: List[LogRecord] = [item]
+            deadline = time.monotonic() + self.flush_interval
+            # Flush on whichever comes first: a full batch or flush_interval.
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await run_in_threadpool(self._write_batch, batch)
+
+    def _write_batch(self, batch: List[LogRecord]) -> None:
+        grouped: Dict[Type[Base], List[Dict[str, Any]]] = {}
+        for model, values in batch:
+            grouped.setdefault(model, []).append(values)
+
+        db = SessionLocal()
+        try:
+            for model, rows in grouped.items():
+                db.execute(insert(model), rows)
+            db.commit()
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+        except Exception:
+            db.rollback()
+            self._stats["failed"] += len(batch)
+            logger.exception("Failed to write %s API log records", len(batch))
+        finally:
+            db.close()
+
+
+api_log_sink = APILogSink(
+    max_queue_size=config("API_LOG_QUEUE_SIZE", default=10_000, cast=int),
+    batch_size=config("API_LOG_BATCH_SIZE", default=500, cast=int),
+    flush_interval=config("API_LOG_FLUSH_INTERVAL", default=1.0, cast=float),
+    policy=config("API_LOG_BACKPRESSURE", default="drop"),
+    sample_rate=config("API_LOG_SAMPLE_RATE", default=0.1, cast=float),
+    block_timeout=config("API_LOG_BLOCK_TIMEOUT", default=0.5, cast=float),
+)
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.authentication.authentication import (
+    authenticate_user_async,
+    get_current_active_user_async,
+)
+from apps.authentication.models import User
+from apps.authentication.permission_cache import get_user_permissions_async
+from apps.authentication.schemas import UserLogin
+from apps.blog.models import Post
+from apps.blog.schemas import PostList
+from apps.database import get_async_db
+from apps.metrics.queries import query_budget
+from base.route import StandardResponse
+
+from .auth_routes import login_response, rejected_login, throttled_login
+
+# Async (AsyncSession) variants of the hot auth endpoints, mounted under /api/v2
+router = APIRouter()
+
+
+@router.post("/login")
+@query_budget(5)  # user, roles, permissions, permission cache miss (2)
+async def login(
+    request: Request,
+    user_credentials: UserLogin,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Login user and return JWT tokens"""
+    client_ip = request.client.host if request.client else None
+    throttled = throttled_login(user_credentials.username, client_ip)
+    if throttled is not None:
+        return throttled
+
+    # Find user and verify (argon2 runs off the event loop)
+    user = await authenticate_user_async(
+        db, user_credentials.username, user_credentials.password
+    )
+    rejected = rejected_login(user, user_credentials.username, client_ip)
+    if rejected is not None:
+        return rejected
+
+    return login_response(user, await get_user_permissions_async(db, user.id))
+
+
+@router.get("/profile")
+@query_budget(2)  # user, posts
+async def get_me(
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get current authenticated user"""
+    posts = await db.scalars(select(Post).where(Post.author_id == current_user.id))
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data={
+                "id": current_user.id,
+                "username": current_user.username,
+                "email": current_user.email,
+                "is_active": current_user.is_active,
+                "posts": [PostList.model_validate(post) for post in posts],
+            },
+            message="User Profile retrieved successfully",
+        ).model_dump(),
+    )
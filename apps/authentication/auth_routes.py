@@ -1,32 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from apps.authentication.authentication import (
+    Principal,
+    authenticate_user,
     create_access_token,
     create_refresh_token,
     get_current_active_user,
-    get_current_user,
+    get_current_active_user_async,
+    get_current_principal,
+    revoke_token,
+    token_claims,
     verify_token,
 )
+from apps.authentication.login_throttle import login_throttle
 from apps.authentication.models import User
+from apps.authentication.permission_cache import (
+    UserPermissions,
+    get_user_permissions,
+    get_user_permissions_async,
+)
 from apps.authentication.schemas import UserCreate, UserLogin, UserRetrieve
-from apps.authentication.utils import hash_password, verify_password
+from apps.authentication.utils import (
+    hash_password_async,
+    verify_password_async,
+)
 from apps.blog.schemas import PostList
-from apps.database import get_db
+from apps.database import get_async_db, get_db
+from apps.metrics.queries import query_budget
 from base.route import StandardResponse
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=StandardResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = (
-        db.query(User)
-        .filter((User.username == user.username) | (User.email == user.email))
-        .first()
+    existing_user = await db.scalar(
+        select(User.id)
+        .where((User.username == user.username) | (User.email == user.email))
+        .limit(1)
     )
     if existing_user:
         # raise HTTPException(
@@ -44,14 +64,13 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     db_user = User(
         username=user.username,
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password_async(user.password),
         is_active=True,
         is_superuser=False,
         # is_verified=False,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
 
     # return StandardResponse(
     #     success=True,
@@ -75,13 +94,26 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
 
 
-@router.post("/login")
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    """Login user and return JWT tokens"""
-    # Find user
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+def throttled_login(username: str, client_ip: Optional[str]) -> Optional[JSONResponse]:
+    """429 for a throttled username/IP, checked before any lookup or hashing"""
+    retry_after = login_throttle.retry_after(username, client_ip)
+    if retry_after is None:
+        return None
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(math.ceil(retry_after))},
+        content=StandardResponse.error_response(
+            message="Too many failed login attempts. Try again later."
+        ).model_dump(),
+    )
+
 
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+def rejected_login(
+    user: Optional[User], username: str, client_ip: Optional[str]
+) -> Optional[JSONResponse]:
+    """Error response for bad credentials or an inactive account, else None"""
+    if not user:
+        login_throttle.record_failure(username, client_ip)
         # raise HTTPException(
         #     status_code=status.HTTP_401_UNAUTHORIZED,
         #     detail="Invalid username or password",
@@ -105,10 +137,19 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
                 message="Inactive user account"
             ).model_dump(),
         )
+    return None
+
+
+def login_response(user: User, permissions: UserPermissions) -> JSONResponse:
+    """Tokens for an authenticated user, whose throttle is reset"""
+    login_throttle.reset(user.username)
 
     # Create tokens
-    access_token = create_access_token(data={"sub": str(user.id)})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    claims = token_claims(permissions)
+    access_token = create_access_token(data=claims)
+    refresh_token = create_refresh_token(
+        data={"sub": str(user.id), "ver": claims["ver"]}
+    )
 
     # return StandardResponse(
     #     success=True,
@@ -144,9 +185,32 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     )
 
 
+@router.post("/login")
+@query_budget(5)  # user, roles, permissions, permission cache miss (2)
+def login(
+    request: Request,
+    user_credentials: UserLogin,
+    db: Session = Depends(get_db),
+):
+    """Login user and return JWT tokens"""
+    client_ip = request.client.host if request.client else None
+    throttled = throttled_login(user_credentials.username, client_ip)
+    if throttled is not None:
+        return throttled
+
+    # Find user and verify (argon2 runs on the hashing executor)
+    user = authenticate_user(db, user_credentials.username, user_credentials.password)
+    rejected = rejected_login(user, user_credentials.username, client_ip)
+    if rejected is not None:
+        return rejected
+
+    return login_response(user, get_user_permissions(db, user.id))
+
+
 @router.post("/logout")
-def logout(current_user: User = Depends(get_current_user)):
-    """Logout user (client-side token removal)"""
+def logout(current_user: Principal = Depends(get_current_principal)):
+    """Logout user: revoke the access token (the client should drop it too)"""
+    revoke_token(current_user)
     # return StandardResponse(
     #     success=True,
     #     data=None,
@@ -162,6 +226,7 @@ def logout(current_user: User = Depends(get_current_user)):
 
 
 @router.get("/profile")
+@query_budget(2)  # user, posts
 def get_me(current_user: User = Depends(get_current_active_user)):
     """Get current authenticated user"""
     # return StandardResponse.success_response(
@@ -209,7 +274,9 @@ def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
             )
 
         # Create new access token
-        new_access_token = create_access_token(data={"sub": str(user.id)})
+        new_access_token = create_access_token(
+            data=token_claims(get_user_permissions(db, user.id))
+        )
 
         # return StandardResponse.success_response(
         #     data={
@@ -243,15 +310,15 @@ def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     current_password: str,
     new_password: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Change user password"""
     # Verify current password
-    if not verify_password(current_password, current_user.hashed_password):
+    if not await verify_password_async(current_password, current_user.hashed_password):
         # return StandardResponse.error_response(
         #     message="Current password is incorrect",
         #     status_code=status.HTTP_400_BAD_REQUEST,
@@ -264,8 +331,8 @@ def change_password(
         )
 
     # Update password
-    current_user.hashed_password = hash_password(new_password)
-    db.commit()
+    current_user.hashed_password = await hash_password_async(new_password)
+    await db.commit()
 
     # return StandardResponse.success_response(message="Password changed successfully")
     return JSONResponse(
@@ -1,16 +1,29 @@
+import hashlib
 import os
+import uuid
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import FrozenSet, Optional
 
 import jwt
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-from apps.database import get_db
+from apps.database import get_async_db, get_db
+from apps.metrics.timing import timed
 
 from .models import User
+from .permission_cache import (
+    UserPermissions,
+    get_user_permissions,
+    get_user_permissions_async,
+)
+from .token_store import get_token_store
+from .utils import verify_and_update_password_async, verify_and_update_password_pooled
 
 load_dotenv()
 
@@ -19,10 +32,49 @@ SECRET_KEY = os.getenv("SECRET_KEY", default="")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+# Trust the active/superuser claims of the access token instead of loading the
+# user on every request. Revocation goes through the token store.
+JWT_STATELESS_AUTH = os.getenv("JWT_STATELESS_AUTH", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller, as far as the access token tells"""
+
+    id: int
+    is_active: bool
+    is_superuser: bool
+    # only resolved (from the permission cache) when a check needs them
+    permissions: FrozenSet[str] = frozenset()
+    permissions_digest: Optional[str] = None
+    token_version: int = 0
+    jti: Optional[str] = None
+    expires_at: Optional[int] = None
+
+
+def permissions_digest(permissions) -> str:
+    """Short stable digest of a set of permission code names"""
+    joined = ",".join(sorted(permissions))
+    return hashlib.sha256(joined.encode()).hexdigest()[:16]
+
+
+def token_claims(entry: UserPermissions) -> dict:
+    """Claims embedded in access tokens (see JWT_STATELESS_AUTH)"""
+    return {
+        "sub": str(entry.user_id),
+        "act": entry.is_active,
+        "su": entry.is_superuser,
+        "pdg": permissions_digest(entry.permissions),
+        "ver": get_token_store().get_version(entry.user_id),
+    }
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -30,7 +82,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now() + expires_delta
     else:
         expire = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -39,41 +91,217 @@ def create_refresh_token(data: dict) -> str:
     """Create JWT refresh token"""
     to_encode = data.copy()
     expire = datetime.now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str) -> int:
-    """Verify JWT token and return user_id"""
+def decode_token(token: str) -> dict:
+    """Verify JWT token (signature, expiry, revocation) and return its payload"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        # token_type: str = payload.get("type")
+    except jwt.InvalidTokenError:
+        raise credentials_exception
+
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise credentials_exception
+    store = get_token_store()
+    jti = payload.get("jti")
+    if jti is not None and store.is_denied(jti):
+        raise credentials_exception
+    if payload.get("ver", 0) < store.get_version(int(user_id)):
+        raise credentials_exception
+    return payload
+
 
-        if user_id is None:
+def verify_token(token: str) -> int:
+    """Verify JWT token and return user_id"""
+    return int(decode_token(token)["sub"])
+
+
+def revoke_token(principal: Principal) -> None:
+    """Deny the caller's access token until it expires (logout)"""
+    if principal.jti is not None and principal.expires_at is not None:
+        get_token_store().deny(principal.jti, principal.expires_at)
+
+
+def _claims_principal(payload: dict) -> Optional[Principal]:
+    """Principal from the token claims alone (stateless mode), else None"""
+    if not (JWT_STATELESS_AUTH and "act" in payload):
+        return None
+    return Principal(
+        id=int(payload["sub"]),
+        is_active=payload["act"],
+        is_superuser=payload.get("su", False),
+        permissions_digest=payload.get("pdg"),
+        token_version=payload.get("ver", 0),
+        jti=payload.get("jti"),
+        expires_at=payload.get("exp"),
+    )
+
+
+def _cached_principal(
+    payload: dict, entry: Optional[UserPermissions], claims: Optional[Principal]
+) -> Principal:
+    """
+    Principal carrying the permissions of `entry` (permission cache).
+    A stateless token whose `pdg` doesn't match them predates a permission
+    change, so its claims are stale: it is rejected and the client has to
+    log in (or refresh) again.
+    """
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    digest = permissions_digest(entry.permissions)
+    if claims is not None:
+        if claims.permissions_digest != digest:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
+                detail="Token is outdated",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return int(user_id)
-    except jwt.ExpiredSignatureError:
+        return replace(claims, permissions=entry.permissions)
+    return Principal(
+        id=entry.user_id,
+        is_active=entry.is_active,
+        is_superuser=entry.is_superuser,
+        permissions=entry.permissions,
+        permissions_digest=digest,
+        token_version=payload.get("ver", 0),
+        jti=payload.get("jti"),
+        expires_at=payload.get("exp"),
+    )
+
+
+def principal_from_token(
+    token: str, db: Session, with_permissions: bool = False
+) -> Principal:
+    """
+    Authenticated caller without loading the User row.
+    In stateless mode the token claims are trusted and, unless
+    `with_permissions`, nothing else is looked up; otherwise the permission
+    cache is used (no query on a hit). `db` is only touched on a cache miss.
+    """
+    payload = decode_token(token)
+    claims = _claims_principal(payload)
+    if claims is not None and not with_permissions:
+        return claims
+    entry = get_user_permissions(db, int(payload["sub"]))
+    return _cached_principal(payload, entry, claims)
+
+
+async def principal_from_token_async(
+    token: str, db: AsyncSession, with_permissions: bool = False
+) -> Principal:
+    """`principal_from_token` for an AsyncSession"""
+    payload = decode_token(token)
+    claims = _claims_principal(payload)
+    if claims is not None and not with_permissions:
+        return claims
+    entry = await get_user_permissions_async(db, int(payload["sub"]))
+    return _cached_principal(payload, entry, claims)
+
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """Authenticated caller, see `principal_from_token`"""
+    with timed("auth"):
+        return principal_from_token(credentials.credentials, db)
+
+
+async def get_current_principal_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """`get_current_principal` for async routes"""
+    with timed("auth"):
+        return await principal_from_token_async(credentials.credentials, db)
+
+
+def get_current_active_principal(
+    principal: Principal = Depends(get_current_principal),
+) -> Principal:
+    """Get current active principal"""
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
+def require_superuser(
+    current_user: Principal = Depends(get_current_active_principal),
+) -> Principal:
+    """Admin-only endpoints (metrics, exports)"""
+    if not current_user.is_superuser:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to access this resource.",
         )
+    return current_user
+
+
+def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+    """
+    User for valid credentials, else None. Unknown usernames still pay for a
+    (dummy) argon2 verify; hashes with outdated parameters are upgraded.
+    """
+    user = db.scalar(
+        select(User)
+        .options(selectinload(User.user_roles), selectinload(User.user_permissions))
+        .where(User.username == username)
+    )
+    valid, new_hash = verify_and_update_password_pooled(
+        password, user.hashed_password if user else None
+    )
+    if not valid:
+        return None
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        db.commit()
+    return user
+
+
+async def authenticate_user_async(
+    db: AsyncSession, username: str, password: str
+) -> Optional[User]:
+    """`authenticate_user` for an AsyncSession"""
+    user = await db.scalar(
+        select(User)
+        .options(selectinload(User.user_roles), selectinload(User.user_permissions))
+        .where(User.username == username)
+    )
+    valid, new_hash = await verify_and_update_password_async(
+        password, user.hashed_password if user else None
+    )
+    if not valid:
+        return None
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
+    return user
 
 
 def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    principal: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ) -> User:
-    """Get current authenticated user"""
-    token = credentials.credentials
-    user_id = verify_token(token)
-    user = db.query(User).filter(User.id == user_id).first()
+    """
+    User row of the caller, for endpoints that need the model (profile,
+    password change). Authenticated like every other endpoint, through the
+    principal; identity-only consumers should depend on that instead.
+    """
+    with timed("auth"):
+        user = db.get(User, principal.id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -90,6 +318,31 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
     return current_user
 
 
+async def get_current_user_async(
+    principal: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """`get_current_user` for async routes"""
+    with timed("auth"):
+        user = await db.get(User, principal.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+async def get_current_active_user_async(
+    current_user: User = Depends(get_current_user_async),
+) -> User:
+    """Get current active user (AsyncSession variant)"""
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+
 # def check_permissions(
 #     required_permissions: list[str],
 #     current_user: User = Depends(get_current_active_user),
@@ -99,25 +352,53 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
 #     return all(perm in user_permissions for perm in required_permissions)
 
 
+def _permission_denied_message(required_permissions: list[str]) -> str:
+    return (
+        required_permissions[0][4:].replace("_", " ").title()
+        if required_permissions
+        else ""
+    )
+
+
+def _authorize(principal: Principal, required_permissions: list[str]) -> Principal:
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    if not all(p in principal.permissions for p in required_permissions):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"You do not have permission to {_permission_denied_message(required_permissions)}.",
+        )
+    return principal
+
+
 def check_permissions(
     required_permissions: list[str],
 ):  # this method expects a list of permission code names like ["can_view_stock", "can_edit_stock"]
+    # Resolved through the permission cache: no user/permission queries on a hit.
     def permission_dependency(
-        current_user: User = Depends(get_current_active_user),
-    ):
-        user_permissions = {perm.code_name for perm in current_user.user_permissions}
-        message = (
-            required_permissions[0][4:].replace("_", " ").title()
-            if required_permissions
-            else ""
-        )
-
-        if not all(p in user_permissions for p in required_permissions):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"You do not have permission to {message}.",
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: Session = Depends(get_db),
+    ) -> Principal:
+        with timed("auth"):
+            principal = principal_from_token(
+                credentials.credentials, db, with_permissions=True
             )
+            return _authorize(principal, required_permissions)
 
-        return current_user
+    return permission_dependency
+
+
+def check_permissions_async(required_permissions: list[str]):
+    """`check_permissions` for async routes"""
+
+    async def permission_dependency(
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: AsyncSession = Depends(get_async_db),
+    ) -> Principal:
+        with timed("auth"):
+            principal = await principal_from_token_async(
+                credentials.credentials, db, with_permissions=True
+            )
+            return _authorize(principal, required_permissions)
 
     return permission_dependency
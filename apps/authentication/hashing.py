@@ -0,0 +1,80 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from decouple import config
+
+
+class PasswordHasher:
+    """
+    Runs argon2 hash/verify calls on a dedicated, bounded executor.
+
+    argon2 is CPU and memory heavy on purpose; doing it on the shared
+    threadpool lets a login burst starve every other sync route. Calls beyond
+    `max_concurrency` wait on a semaphore instead of piling up in the
+    executor queue. argon2-cffi releases the GIL, so threads scale across
+    cores; `use_processes` is there for backends that don't.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_concurrency: int,
+        use_processes: bool = False,
+    ):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        # asyncio primitives are bound to the loop they're first used on
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run `func(*args)` on the hashing executor (must be picklable for processes)"""
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(func, *args))
+
+    def run_sync(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        `run` for sync routes: blocks the calling thread, but the executor
+        still bounds how many hashes run at once
+        """
+        return self.executor.submit(func, *args).result()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_default_workers = min(4, os.cpu_count() or 1)
+
+password_hasher = PasswordHasher(
+    max_workers=config("PASSWORD_HASH_WORKERS", default=_default_workers, cast=int),
+    max_concurrency=config(
+        "PASSWORD_HASH_CONCURRENCY", default=_default_workers * 4, cast=int
+    ),
+    use_processes=config("PASSWORD_HASH_USE_PROCESSES", default=False, cast=bool),
+)
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from decouple import config
+
+
+class LoginThrottle:
+    """
+    Failed-login counters per username and per client IP (fixed window, per
+    process). Once a key reaches its limit, login is refused before any user
+    lookup or argon2 work until the window ends, so a credential-stuffing
+    burst can't keep the hashing workers busy.
+    """
+
+    def __init__(
+        self,
+        max_attempts_per_user: int,
+        max_attempts_per_ip: int,
+        window: float,
+        maxsize: int = 100_000,
+    ):
+        self.max_attempts_per_user = max_attempts_per_user
+        self.max_attempts_per_ip = max_attempts_per_ip
+        self.window = window
+        self.maxsize = maxsize
+        # key -> (window start, failures)
+        self._data: "OrderedDict[tuple[str, str], tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _failures(self, key, now: float) -> tuple[float, int]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] + self.window <= now:
+            return now, 0
+        return entry
+
+    def retry_after(self, username: str, ip: Optional[str]) -> Optional[float]:
+        """Seconds until login is allowed again, or None if it is allowed now"""
+        now = time.monotonic()
+        with self._lock:
+            for key, limit in self._keys(username, ip):
+                started, failures = self._failures(key, now)
+                if failures >= limit:
+                    return started + self.window - now
+        return None
+
+    def record_failure(self, username: str, ip: Optional[str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key, _ in self._keys(username, ip):
+                started, failures = self._failures(key, now)
+                self._data[key] = (started, failures + 1)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def reset(self, username: str) -> None:
+        """Successful login: clear the username counter (the IP one stays)"""
+        with self._lock:
+            self._data.pop(("user", username.lower()), None)
+
+    def _keys(self, username: str, ip: Optional[str]):
+        yield ("user", username.lower()), self.max_attempts_per_user
+        if ip is not None:
+            yield ("ip", ip), self.max_attempts_per_ip
+
+
+login_throttle = LoginThrottle(
+    max_attempts_per_user=config("LOGIN_MAX_ATTEMPTS_PER_USER", default=5, cast=int),
+    max_attempts_per_ip=config("LOGIN_MAX_ATTEMPTS_PER_IP", default=50, cast=int),
+    window=config("LOGIN_ATTEMPT_WINDOW", default=300.0, cast=float),
+)
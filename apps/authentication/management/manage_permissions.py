@@ -1,4 +1,3 @@
-from colorama import Fore
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
@@ -24,6 +23,8 @@ from apps.notification.models import (
 
 
 def run_permission_setup():
+    from colorama import Fore  # only this command needs it
+
     db: Session = SessionLocal()
     try:
         # ------------------- Existing permissions & categories -------------------
@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from decouple import config
+from sqlalchemy import event, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from .models import CustomPermission, CustomRole, User
+from .models.users import role_permissions, user_permissions, user_roles
+
+
+@dataclass(frozen=True)
+class UserPermissions:
+    """What check_permissions needs to know about a user, without a User row"""
+
+    user_id: int
+    is_active: bool
+    is_superuser: bool
+    permissions: FrozenSet[str]  # direct + inherited from active roles
+
+
+class PermissionCache:
+    """TTL + LRU bounded map of user id -> UserPermissions (per process)"""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[int, tuple[float, UserPermissions]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserPermissions]:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return value
+
+    def set(self, value: UserPermissions) -> None:
+        with self._lock:
+            self._data[value.user_id] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(value.user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+permission_cache = PermissionCache(
+    ttl=config("PERMISSION_CACHE_TTL", default=60.0, cast=float),
+    maxsize=config("PERMISSION_CACHE_SIZE", default=10_000, cast=int),
+)
+
+
+def _user_statement(user_id: int):
+    return select(User.id, User.is_active, User.is_superuser).where(User.id == user_id)
+
+
+def _codes_statement(user_id: int):
+    direct = (
+        select(CustomPermission.code_name)
+        .join(user_permissions, user_permissions.c.permission_id == CustomPermission.id)
+        .where(user_permissions.c.user_id == user_id)
+    )
+    inherited = (
+        select(CustomPermission.code_name)
+        .join(role_permissions, role_permissions.c.permission_id == CustomPermission.id)
+        .join(CustomRole, CustomRole.id == role_permissions.c.role_id)
+        .join(user_roles, user_roles.c.role_id == CustomRole.id)
+        .where(user_roles.c.user_id == user_id, CustomRole.is_active)
+    )
+    return union(direct, inherited)
+
+
+def get_user_permissions(db: Session, user_id: int) -> Optional[UserPermissions]:
+    """Cached permissions of `user_id`; None if the user does not exist"""
+    cached = permission_cache.get(user_id)
+    if cached is not None:
+        return cached
+    user = db.execute(_user_statement(user_id)).first()
+    if user is None:
+        return None
+    value = UserPermissions(
+        user_id=user.id,
+        is_active=bool(user.is_active),
+        is_superuser=bool(user.is_superuser),
+        permissions=frozenset(db.scalars(_codes_statement(user_id))),
+    )
+    permission_cache.set(value)
+    return value
+
+
+async def get_user_permissions_async(
+    db: AsyncSession, user_id: int
+) -> Optional[UserPermissions]:
+    """`get_user_permissions` for an AsyncSession"""
+    cached = permission_cache.get(user_id)
+    if cached is not None:
+        return cached
+    user = (await db.execute(_user_statement(user_id))).first()
+    if user is None:
+        return None
+    value = UserPermissions(
+        user_id=user.id,
+        is_active=bool(user.is_active),
+        is_superuser=bool(user.is_superuser),
+        permissions=frozenset(await db.scalars(_codes_statement(user_id))),
+    )
+    permission_cache.set(value)
+    return value
+
+
+# ------------------- Invalidation hooks -------------------
+# Changes are collected on the session and applied after commit, so a
+# concurrent request can't re-cache the old state between flush and commit.
+_PENDING_KEY = "permission_cache_invalidations"
+_ALL = "all"
+
+
+def _schedule(target, key) -> None:
+    """`key` is a user id or _ALL"""
+    db = object_session(target)
+    if db is None:
+        # detached object: nothing to wait for
+        _invalidate({key})
+        return
+    db.info.setdefault(_PENDING_KEY, set()).add(key)
+
+
+def _invalidate(keys) -> None:
+    if _ALL in keys:
+        permission_cache.invalidate_all()
+        return
+    for user_id in keys:
+        permission_cache.invalidate(user_id)
+
+
+def _on_user_change(target, *args):
+    if target.id is not None:
+        _schedule(target, target.id)
+
+
+def _on_role_change(target, *args):
+    _schedule(target, _ALL)
+
+
+for attribute in (User.user_roles, User.user_permissions):
+    for name in ("append", "remove", "bulk_replace"):
+        event.listen(attribute, name, _on_user_change)
+for attribute in (User.is_active, User.is_superuser):
+    event.listen(attribute, "set", _on_user_change)
+for attribute in (CustomRole.permissions, CustomRole.users):
+    for name in ("append", "remove", "bulk_replace"):
+        event.listen(attribute, name, _on_role_change)
+event.listen(CustomRole.is_active, "set", _on_role_change)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(db: Session) -> None:
+    pending = db.info.pop(_PENDING_KEY, None)
+    if pending:
+        _invalidate(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(db: Session) -> None:
+    db.info.pop(_PENDING_KEY, None)
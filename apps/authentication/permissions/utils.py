@@ -3,8 +3,12 @@ from typing import List
 
 from fastapi import Depends, HTTPException, security, status
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
 
-from ..authentication import get_current_active_user, verify_token
+from apps.database import get_db
+
+from ..authentication import Principal, get_current_active_user, principal_from_token
+from ..authentication import security as bearer_security
 from ..models import User
 
 
@@ -54,17 +58,33 @@ class HttpBasedPermissionActionMaps:
 
 def check_permissions(
     required_permissions: list[str],
-    current_user: User = Depends(get_current_active_user),
+    current_user: User | Principal = Depends(get_current_active_user),
 ) -> bool:
-    """Check if current user has required permissions"""
-    user_permissions = {perm.code_name for perm in current_user.user_permissions}
+    """Check if current user has required permissions (direct or via roles)"""
+    if isinstance(current_user, Principal):
+        user_permissions = current_user.permissions
+    else:
+        user_permissions = {perm.code_name for perm in current_user.user_permissions}
+        user_permissions |= {
+            perm.code_name
+            for role in current_user.user_roles
+            if role.is_active
+            for perm in role.permissions
+        }
     return all(perm in user_permissions for perm in required_permissions)
 
 
 def require_permission(permission: str):
     def dependency(
-        current_user: User = Depends(get_current_active_user),
-    ):
+        credentials: HTTPAuthorizationCredentials = Depends(bearer_security),
+        db: Session = Depends(get_db),
+    ) -> Principal:
+        # cached: no user/permission queries on a hit
+        current_user = principal_from_token(
+            credentials.credentials, db, with_permissions=True
+        )
+        if not current_user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
         if not check_permissions(
             [permission], current_user
         ):  # pass the required permission as a list to the check_permissions function
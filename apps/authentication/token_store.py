@@ -0,0 +1,103 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .models import User
+
+
+class TokenStore(ABC):
+    """
+    Revocation state for access/refresh tokens.
+
+    A token is rejected when its jti is denied or its `ver` claim is older than
+    the user's current token version. Bumping the version revokes every token
+    the user holds. The in-memory store is per process; use a shared backend
+    (Redis, a DB table) via `set_token_store` when running several workers.
+    """
+
+    @abstractmethod
+    def get_version(self, user_id: int) -> int: ...
+
+    @abstractmethod
+    def bump_version(self, user_id: int) -> int: ...
+
+    @abstractmethod
+    def deny(self, jti: str, expires_at: float) -> None: ...
+
+    @abstractmethod
+    def is_denied(self, jti: str) -> bool: ...
+
+
+class InMemoryTokenStore(TokenStore):
+    def __init__(self):
+        self._versions: Dict[int, int] = {}
+        self._denied: Dict[str, float] = {}  # jti -> exp (unix time)
+        self._lock = threading.Lock()
+
+    def get_version(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    def bump_version(self, user_id: int) -> int:
+        with self._lock:
+            version = self._versions.get(user_id, 0) + 1
+            self._versions[user_id] = version
+            return version
+
+    def deny(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._purge()
+            self._denied[jti] = expires_at
+
+    def is_denied(self, jti: str) -> bool:
+        expires_at = self._denied.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def _purge(self) -> None:
+        # expired tokens are rejected anyway, no need to remember them
+        now = time.time()
+        for jti in [j for j, exp in self._denied.items() if exp <= now]:
+            del self._denied[jti]
+
+
+_token_store: TokenStore = InMemoryTokenStore()
+
+
+def get_token_store() -> TokenStore:
+    return _token_store
+
+
+def set_token_store(store: TokenStore) -> None:
+    global _token_store
+    _token_store = store
+
+
+# Deactivating a user revokes their tokens (stateless tokens carry the active
+# flag, so they would otherwise stay valid until they expire). Applied after
+# commit, like the permission cache invalidations.
+_PENDING_KEY = "token_store_revocations"
+
+
+@event.listens_for(User.is_active, "set")
+def _on_deactivate(target, value, oldvalue, initiator):
+    if target.id is None or value:
+        return
+    db = object_session(target)
+    if db is None:
+        get_token_store().bump_version(target.id)
+        return
+    db.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_revocations(db: Session) -> None:
+    for user_id in db.info.pop(_PENDING_KEY, ()):
+        get_token_store().bump_version(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_revocations(db: Session) -> None:
+    db.info.pop(_PENDING_KEY, None)
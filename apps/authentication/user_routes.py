@@ -76,15 +76,17 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from apps.database import get_db
+from apps.database import get_async_db, get_db
 from base.pagination import paginate
 from base.route import StandardResponse
 
 from .models import User
 from .schemas import UserCreate, UserList, UserLogin, UserRetrieve, UserUpdate
-from .utils import hash_password, verify_password
+from .utils import hash_password_async
 
 router = APIRouter()
 
@@ -92,13 +94,13 @@ router = APIRouter()
 @router.post(
     "/create", response_model=StandardResponse, status_code=status.HTTP_201_CREATED
 )
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new user"""
     # Check if user exists already
-    existing_user = (
-        db.query(User)
-        .filter((User.username == user.username) | (User.email == user.email))
-        .first()
+    existing_user = await db.scalar(
+        select(User.id)
+        .where((User.username == user.username) | (User.email == user.email))
+        .limit(1)
     )
     if existing_user:
         return JSONResponse(
@@ -112,14 +114,14 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     db_user = User(
         username=user.username,
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password_async(user.password),
         is_active=True,
         is_superuser=False,
         # is_verified=False,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     return JSONResponse(
         status_code=status.HTTP_201_CREATED,
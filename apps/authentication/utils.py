@@ -1,12 +1,81 @@
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from decouple import config
+
+from .hashing import password_hasher
+
 
 # pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto") only supports upto 72 bits of character]
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """
+    argon2 cost (passlib defaults: t=3, m=64 MiB, p=4). Existing hashes keep
+    verifying after a change, the parameters are stored in each hash.
+    passlib and argon2 are imported on first use, not at worker startup.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__rounds=config("ARGON2_TIME_COST", default=3, cast=int),
+        argon2__memory_cost=config("ARGON2_MEMORY_COST", default=65536, cast=int),
+        argon2__parallelism=config("ARGON2_PARALLELISM", default=4, cast=int),
+    )
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """`hash_password` on the hashing executor, off the event loop"""
+    return await password_hasher.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """`verify_password` on the hashing executor, off the event loop"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    # hashed with the current parameters, so a miss costs what a hit costs
+    return get_pwd_context().hash("dummy-password-for-unknown-users")
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """
+    (valid, new_hash). new_hash is set when the stored hash uses outdated
+    parameters and should be persisted. With no stored hash (unknown user) a
+    dummy verify runs anyway so the response time doesn't reveal the miss.
+    """
+    if hashed_password is None:
+        get_pwd_context().verify(plain_password, _dummy_hash())
+        return False, None
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def verify_and_update_password_pooled(
+    plain_password: str, hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """`verify_and_update_password` on the hashing executor, from a sync route"""
+    return password_hasher.run_sync(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """`verify_and_update_password` on the hashing executor"""
+    return await password_hasher.run(
+        verify_and_update_password, plain_password, hashed_password
+    )
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from apps.authentication.models import User
 from apps.database import get_db
+from base.cache import response_cache
+from base.conditional import get_validator, row_state
+from base.count import CountStrategy, count_cache
 from base.route import (
     CreateRouter,
     ReadRouter,
     RetrieveRouter,
+    StandardJSONResponse,
     StandardResponse,
     UpdateRouter,
 )
@@ -61,6 +65,8 @@ class PostCreateRouter(CreateRouter[Post, PostCreate]):
         db_item = self.model(**item.model_dump())
         db.add(db_item)
         db.commit()
+        response_cache.invalidate("posts:list")
+        count_cache.invalidate_tables(Post.__tablename__)
         db.refresh(db_item)
         return StandardResponse(
             success=True,
@@ -80,14 +86,23 @@ class PostListRouter(ReadRouter[Post, PostList]):
 
 
 class PostRetrieveRouter(RetrieveRouter[Post, PostRetrieve]):
-    def retrieve(self, id: int, db: Session = Depends(get_db)):
+    def retrieve(self, id: int, request: Request, db: Session = Depends(get_db)):
+        validator = get_validator(db, row_state(self.model, id), request)
+        if validator is None:
+            raise HTTPException(status_code=404, detail="Post not found.")
+        if validator.matches(request):
+            return validator.not_modified()
         db_item = db.query(self.model).filter(self.model.id == id).first()
         if not db_item:
             raise HTTPException(status_code=404, detail="Post not found.")
-        return StandardResponse(
-            success=True,
-            data=self.schema.model_validate(db_item),
-            message="Post retrieved successfully.",
+        return validator.apply(
+            StandardJSONResponse(
+                content=StandardResponse(
+                    success=True,
+                    data=self.schema.model_validate(db_item),
+                    message="Post retrieved successfully.",
+                )
+            )
         )
 
 
@@ -97,12 +112,16 @@ post_routers = [
         PostList,
         prefix="/list",
         # tags=["posts"],
+        keyset=("id",),
+        count_strategy=CountStrategy.CACHED,
+        cache_tags=("posts:list",),
     ),
     PostRetrieveRouter(
         Post,
         PostRetrieve,
         prefix="/retrieve/{id}",
         # tags=["posts"],
+        cache_tags=("post:{id}",),
     ),
     PostCreateRouter(
         Post,
@@ -1,11 +1,85 @@
 from decouple import config
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-engine = create_engine(config("DATABASE_URL_"), future=True)
+from apps.metrics.pool import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    register_pool_listeners,
+)
+from apps.metrics.queries import register_query_guard
+from apps.metrics.timing import register_timing_listeners
+
+# asyncio driver used for each backend when ASYNC_DATABASE_URL_ is not set
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Derive the asyncio URL from the sync one (psycopg2 -> asyncpg, ...)"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return url.render_as_string(hide_password=False)
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(
+        hide_password=False
+    )
+
+
+def get_pool_options(url: str, poolclass) -> dict:
+    """
+    Env-driven pool settings. Size them so that
+    workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays below max_connections.
+    SQLite only gets the instrumented pool (file databases) or nothing.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        in_memory = url.database in (None, "", ":memory:")
+        return {} if in_memory else {"poolclass": poolclass}
+    return {
+        "poolclass": poolclass,
+        "pool_size": config("DB_POOL_SIZE", default=5, cast=int),
+        "max_overflow": config("DB_MAX_OVERFLOW", default=10, cast=int),
+        "pool_timeout": config("DB_POOL_TIMEOUT", default=30.0, cast=float),
+        "pool_recycle": config("DB_POOL_RECYCLE", default=1800, cast=int),
+        "pool_pre_ping": config("DB_POOL_PRE_PING", default=True, cast=bool),
+    }
+
+
+DATABASE_URL = config("DATABASE_URL_")
+ASYNC_DATABASE_URL = config(
+    "ASYNC_DATABASE_URL_", default=get_async_database_url(DATABASE_URL)
+)
+
+engine = create_engine(
+    DATABASE_URL,
+    future=True,
+    **get_pool_options(DATABASE_URL, InstrumentedQueuePool),
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **get_pool_options(ASYNC_DATABASE_URL, InstrumentedAsyncAdaptedQueuePool),
+)
+register_pool_listeners(engine)
+register_pool_listeners(async_engine.sync_engine)
+# query count / DB time of the current request (Server-Timing, APILog)
+register_timing_listeners(engine)
+register_timing_listeners(async_engine.sync_engine)
+# debug mode: repeated statements / per-endpoint query budgets
+register_query_guard(engine, async_engine.sync_engine)
+# expire_on_commit=False: attributes stay loaded after commit, since an
+# AsyncSession cannot lazy-load them again implicitly.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 def get_db():
     db = SessionLocal()
@@ -13,3 +87,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,145 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (ms) of the checkout latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 5, 25, 100, 500)
+
+
+class PoolMetrics:
+    """Counters for one connection pool. Updated from worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.waits = 0  # checkouts that found the pool and overflow exhausted
+        self.timeouts = 0
+        self.overflow_checkouts = 0  # checkouts served beyond pool_size
+        self.max_overflow_used = 0
+        self.connects = 0  # new DBAPI connections opened
+        self.invalidations = 0
+        self.checkout_time_total = 0.0
+        self.checkout_time_max = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record_checkout(self, elapsed: float, waited: bool, overflow: int) -> None:
+        elapsed_ms = elapsed * 1000
+        bucket = next(
+            (i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms < bound),
+            len(LATENCY_BUCKETS_MS),
+        )
+        with self._lock:
+            self.checkouts += 1
+            self.waits += waited
+            self.checkout_time_total += elapsed
+            self.checkout_time_max = max(self.checkout_time_max, elapsed)
+            self.latency_buckets[bucket] += 1
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.max_overflow_used = max(self.max_overflow_used, overflow)
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"<{bound}ms" for bound in LATENCY_BUCKETS_MS]
+            labels.append(f">={LATENCY_BUCKETS_MS[-1]}ms")
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "max_overflow_used": self.max_overflow_used,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "checkout_ms_avg": (
+                    self.checkout_time_total / self.checkouts * 1000
+                    if self.checkouts
+                    else 0.0
+                ),
+                "checkout_ms_max": self.checkout_time_max * 1000,
+                "checkout_latency": dict(zip(labels, self.latency_buckets)),
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Times every checkout; `metrics` survives pool.recreate() (dispose)."""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        exhausted = (
+            self._max_overflow > -1
+            and self.checkedin() == 0
+            and self.overflow() >= self._max_overflow
+        )
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.metrics.incr("timeouts")
+            raise
+        self.metrics.record_checkout(
+            time.perf_counter() - started, exhausted, self.overflow()
+        )
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def register_pool_listeners(engine) -> None:
+    """Pool event listeners for connects, checkins and invalidations."""
+
+    def metrics():
+        return getattr(engine.pool, "metrics", None)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if metrics() is not None:
+            metrics().incr("connects")
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        if metrics() is not None:
+            metrics().incr("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        if metrics() is not None:
+            metrics().incr("invalidations")
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if hasattr(pool, "metrics"):
+        stats.update(pool.metrics.snapshot())
+    return stats
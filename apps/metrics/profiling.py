@@ -0,0 +1,146 @@
+import asyncio
+import cProfile
+import io
+import pstats
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+
+from decouple import config
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.authentication.authentication import Principal, principal_from_token
+from apps.database import SessionLocal
+
+REQUEST_PROFILING_ENABLED = config("REQUEST_PROFILING_ENABLED", default=True, cast=bool)
+PROFILE_PARAM = "__profile"
+PROFILE_TOP = config("REQUEST_PROFILING_TOP", default=50, cast=int)
+
+
+def _profile_principal(authorization: Optional[str]) -> Principal:
+    # own short-lived session, the request has not reached its dependencies yet
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated"
+        )
+    db = SessionLocal()
+    try:
+        return principal_from_token(token, db)
+    finally:
+        db.close()
+
+
+def _cprofile_report(profiler: cProfile.Profile) -> str:
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP)
+    return output.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    `?__profile=1` (superusers only): run the request under cProfile and
+    answer with the report instead of the response. `?__profile=pyinstrument`
+    uses pyinstrument when it is installed.
+
+    One profiled request at a time per worker. The profiler sees the whole
+    process (threadpool included on Python 3.12+), so requests running
+    alongside show up in the report too: profile on a quiet worker.
+    """
+
+    def __init__(self, app: ASGIApp, enabled: bool = REQUEST_PROFILING_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            not self.enabled
+            or scope["type"] != "http"
+            or PROFILE_PARAM.encode() not in scope.get("query_string", b"")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        query = parse_qsl(scope["query_string"].decode(), keep_blank_values=True)
+        mode = dict(query).get(PROFILE_PARAM)
+        if mode in (None, "", "0"):
+            await self.app(scope, receive, send)
+            return
+        # the endpoint must not see (or reject) the profiling parameter
+        scope = {
+            **scope,
+            "query_string": urlencode(
+                [(key, value) for key, value in query if key != PROFILE_PARAM]
+            ).encode(),
+        }
+
+        try:
+            principal = await run_in_threadpool(
+                _profile_principal, Headers(scope=scope).get("authorization")
+            )
+        except HTTPException as exc:
+            response = JSONResponse(
+                status_code=exc.status_code, content={"detail": exc.detail}
+            )
+            await response(scope, receive, send)
+            return
+        if not principal.is_active or not principal.is_superuser:
+            response = JSONResponse(
+                status_code=status.HTTP_403_FORBIDDEN,
+                content={"detail": "Profiling is restricted to superusers."},
+            )
+            await response(scope, receive, send)
+            return
+
+        response_status = 500
+
+        async def discard(message: Message) -> None:
+            # the report replaces the response
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+
+        async with self._lock:
+            if mode == "pyinstrument":
+                report = await self._pyinstrument(scope, receive, discard)
+            else:
+                report = await self._cprofile(scope, receive, discard)
+        if report is None:
+            response = JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": "pyinstrument is not installed."},
+            )
+        else:
+            response = PlainTextResponse(
+                f"{scope['method']} {scope['path']} -> {response_status}\n\n{report}"
+            )
+        await response(scope, receive, send)
+
+    async def _cprofile(self, scope: Scope, receive: Receive, send: Send) -> str:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+        return _cprofile_report(profiler)
+
+    async def _pyinstrument(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> Optional[str]:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            return None
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+        return profiler.output_text(unicode=True, color=False)
@@ -0,0 +1,195 @@
+"""
+Debug-mode query guard (QUERY_GUARD_ENABLED).
+
+Counts the statements of each request (on top of apps.metrics.timing),
+flags statements repeated with different parameters (N+1 lazy loads) with
+the route and relationship that issued them, and checks per-endpoint query
+budgets:
+
+    @router.get("/profile")
+    @query_budget(3)
+    def get_me(...): ...
+
+With QUERY_GUARD_STRICT an exceeded budget raises QueryBudgetExceeded
+(an AssertionError), which fails the test that made the request.
+`assert_max_queries` does the same for any block of test code.
+"""
+
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from decouple import config
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.types import Scope
+
+from .timing import RequestTimings, current_timings
+
+logger = logging.getLogger(__name__)
+
+QUERY_GUARD_ENABLED = config("QUERY_GUARD_ENABLED", default=False, cast=bool)
+QUERY_GUARD_STRICT = config("QUERY_GUARD_STRICT", default=False, cast=bool)
+# same SQL this many times in one request is reported
+QUERY_GUARD_REPEAT_THRESHOLD = config(
+    "QUERY_GUARD_REPEAT_THRESHOLD", default=3, cast=int
+)
+# budget of endpoints without @query_budget; 0: none
+QUERY_GUARD_DEFAULT_BUDGET = config("QUERY_GUARD_DEFAULT_BUDGET", default=0, cast=int)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryTrace:
+    """Statements run by one request (or one assert_max_queries block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements: Dict[str, int] = {}  # SQL -> executions
+        self.relationships: Dict[str, Set[str]] = {}  # SQL -> "User.posts", ...
+        self.pending_relationship: Optional[str] = None
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        if self.pending_relationship is not None:
+            self.relationships.setdefault(statement, set()).add(
+                self.pending_relationship
+            )
+            self.pending_relationship = None
+
+    def repeated(
+        self, threshold: int = QUERY_GUARD_REPEAT_THRESHOLD
+    ) -> List[Tuple[str, int, Set[str]]]:
+        """(SQL, executions, relationships) run at least `threshold` times"""
+        return [
+            (statement, count, self.relationships.get(statement, set()))
+            for statement, count in self.statements.items()
+            if count >= threshold
+        ]
+
+    def summary(self) -> Dict[str, object]:
+        """For APILog.system_details"""
+        return {
+            "statements": len(self.statements),
+            "repeated": [
+                {"sql": statement[:500], "count": count, "relationships": sorted(rel)}
+                for statement, count, rel in self.repeated()
+            ],
+        }
+
+    def describe(self) -> str:
+        return "\n".join(
+            f"  {count}x {statement}"
+            for statement, count in sorted(self.statements.items(), key=lambda i: -i[1])
+        )
+
+
+def _request_trace() -> Optional[QueryTrace]:
+    timings = current_timings()
+    if timings is None:
+        return None
+    if timings.queries is None:
+        timings.queries = QueryTrace()
+    return timings.queries
+
+
+def _relationship_name(state: ORMExecuteState) -> str:
+    path = state.loader_strategy_path
+    prop = path[-1] if path is not None and len(path) else None
+    if prop is not None and hasattr(prop, "parent"):
+        return f"{prop.parent.class_.__name__}.{prop.key}"
+    return "?"
+
+
+def register_query_guard(*engines) -> None:
+    """No-op unless QUERY_GUARD_ENABLED"""
+    if not QUERY_GUARD_ENABLED:
+        return
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        trace = _request_trace()
+        if trace is not None:
+            trace.record(statement)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+    @event.listens_for(Session, "do_orm_execute")
+    def do_orm_execute(state: ORMExecuteState):
+        # lazy/selectin loads: remember which relationship the next statement serves
+        if state.is_relationship_load:
+            trace = _request_trace()
+            if trace is not None:
+                trace.pending_relationship = _relationship_name(state)
+
+
+def query_budget(limit: int) -> Callable:
+    """Max statements per request of the decorated endpoint (goes under @router.*)"""
+
+    def decorator(func: Callable) -> Callable:
+        func.query_budget = limit
+        return func
+
+    return decorator
+
+
+def _route_name(scope: Scope) -> str:
+    """e.g. GET /api/v1/auth/profile (apps.authentication.auth_routes.get_me)"""
+    name = f"{scope['method']} {scope['path']}"
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        name += f" ({endpoint.__module__}.{endpoint.__qualname__})"
+    return name
+
+
+def check_request_queries(timings: Optional[RequestTimings], scope: Scope) -> None:
+    """After a request: report repeated statements, enforce the endpoint's budget"""
+    trace = timings.queries if timings is not None else None
+    if trace is None:
+        return
+    route = _route_name(scope)
+    for statement, count, relationships in trace.repeated():
+        logger.warning(
+            "%s ran the same statement %d times (%s): %s",
+            route,
+            count,
+            ", ".join(sorted(relationships)) or "not a relationship load",
+            statement,
+        )
+    budget = getattr(scope.get("endpoint"), "query_budget", QUERY_GUARD_DEFAULT_BUDGET)
+    if budget and trace.count > budget:
+        message = f"{route} ran {trace.count} statements, budget is {budget}:\n{trace.describe()}"
+        if QUERY_GUARD_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+@contextmanager
+def assert_max_queries(limit: int, *engines) -> Iterator[QueryTrace]:
+    """
+    Test helper: fail when the block runs more than `limit` statements, on
+    any thread (TestClient requests included). Defaults to both app engines.
+    """
+    if not engines:
+        from apps.database import async_engine, engine
+
+        engines = (engine, async_engine.sync_engine)
+    trace = QueryTrace()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        trace.record(statement)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield trace
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    if trace.count > limit:
+        raise QueryBudgetExceeded(
+            f"{trace.count} statements, expected at most {limit}:\n{trace.describe()}"
+        )
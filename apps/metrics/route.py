@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+
+from apps.api_logs.sink import api_log_sink
+from apps.authentication.authentication import Principal, require_superuser
+from apps.database import async_engine, engine
+from apps.notification.hub import notification_hub
+from base.cache import response_cache
+from base.route import StandardResponse
+
+from .pool import pool_stats
+
+router = APIRouter()
+
+
+@router.get("/pool", response_model=StandardResponse)
+def get_pool_metrics(current_user: Principal = Depends(require_superuser)):
+    """Connection pool gauges and checkout latency/wait/overflow counters"""
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data={
+                "sync": pool_stats(engine),
+                "async": pool_stats(async_engine.sync_engine),
+                "api_log_sink": api_log_sink.stats(),
+                "notification_hub": notification_hub.stats(),
+                "response_cache": response_cache.stats(),
+            },
+            message="Pool metrics fetched successfully.",
+        ).model_dump(),
+    )
@@ -0,0 +1,109 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from decouple import config
+from sqlalchemy import event
+
+REQUEST_TIMING_ENABLED = config("REQUEST_TIMING_ENABLED", default=True, cast=bool)
+
+
+class RequestTimings:
+    """
+    Where one request's time went. Set per request by the logging
+    middleware; the context (and this object with it) follows the request
+    into threadpool workers, so sync endpoints and DB listeners add to it.
+    """
+
+    __slots__ = ("started", "db_count", "db_time", "spans", "queries")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.spans: Dict[str, float] = {}  # name -> seconds, accumulated
+        self.queries = None  # QueryTrace, filled by the query guard (queries.py)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        """For APILog.system_details (milliseconds)"""
+        details = {
+            "total_ms": round(self.total() * 1000, 3),
+            "db_ms": round(self.db_time * 1000, 3),
+            "db_queries": self.db_count,
+            **{f"{name}_ms": round(s * 1000, 3) for name, s in self.spans.items()},
+        }
+        if self.queries is not None:
+            details["query_guard"] = self.queries.summary()
+        return details
+
+    def server_timing(self) -> str:
+        """Server-Timing header value"""
+        metrics: List[str] = [
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.db_count} queries"'
+        ]
+        metrics.extend(f"{name};dur={s * 1000:.2f}" for name, s in self.spans.items())
+        metrics.append(f"total;dur={self.total() * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timing() -> Optional[RequestTimings]:
+    if not REQUEST_TIMING_ENABLED:
+        return None
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def timed(name: str):
+    """Add the block's duration to span `name` of the current request, if any"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def register_timing_listeners(engine) -> None:
+    """Attribute query count and DB time to the request running the query"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if _current.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        timings = _current.get()
+        started = conn.info.get("query_started")
+        if timings is None or not started:
+            return
+        timings.db_count += 1
+        timings.db_time += time.perf_counter() - started.pop()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # a failed statement never reaches after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
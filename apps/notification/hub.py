@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Set
+
+from decouple import config
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from apps.database import ASYNC_DATABASE_URL, engine
+
+logger = logging.getLogger(__name__)
+
+Message = Dict[str, Any]  # {"user_ids": [..] or None (everyone), "event": {..}}
+
+_CLOSED = object()  # queued to end a subscription (eviction, disconnect, shutdown)
+
+
+class Subscription:
+    """One open stream: a bounded buffer of events for one user"""
+
+    def __init__(self, user_id: int, buffer_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.evicted = False
+
+    def close(self) -> None:
+        # make room for the sentinel; whatever is still buffered is dropped
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+    async def events(self, heartbeat: float) -> AsyncIterator[Optional[dict]]:
+        """Yield events as they arrive, and None every `heartbeat` idle seconds"""
+        while True:
+            try:
+                item = await asyncio.wait_for(self.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if item is _CLOSED:
+                return
+            yield item
+
+
+class HubBackend(ABC):
+    """
+    Transport between publishers and the hubs of every worker. The local
+    backend only reaches this process; a shared one (Postgres LISTEN/NOTIFY)
+    delivers to all workers, each of which fans out to its own connections.
+    """
+
+    async def start(self, deliver: Callable[[Message], None]) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    def publish(self, message: Message) -> None:
+        """Called from any thread (sync routes, background tasks) or the loop"""
+
+
+class LocalBackend(HubBackend):
+    def publish(self, message: Message) -> None:
+        self._deliver(message)
+
+
+class PostgresNotifyBackend(HubBackend):
+    """
+    pg_notify on publish, LISTEN on a dedicated asyncpg connection per worker.
+    Payloads are capped at 8000 bytes by Postgres; events are kept small.
+    """
+
+    def __init__(self, url: str, channel: str = "notifications"):
+        self.url = url
+        self.channel = channel
+        self._connection = None
+
+    async def start(self, deliver: Callable[[Message], None]) -> None:
+        import asyncpg
+
+        await super().start(deliver)
+        url = make_url(self.url).set(drivername="postgresql")
+        self._connection = await asyncpg.connect(
+            url.render_as_string(hide_password=False)
+        )
+        await self._connection.add_listener(self.channel, self._on_notify)
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self._deliver(json.loads(payload))
+
+    def publish(self, message: Message) -> None:
+        payload = json.dumps(message, default=str)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None:
+            # don't block the loop on a sync round trip
+            running.run_in_executor(None, self._notify, payload)
+        else:
+            self._notify(payload)
+
+    def _notify(self, payload: str) -> None:
+        try:
+            with engine.begin() as connection:
+                connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": self.channel, "payload": payload},
+                )
+        except Exception:
+            logger.exception("Failed to publish notification event")
+
+
+class NotificationHub:
+    """
+    In-process pub/sub feeding the SSE/WebSocket streams.
+
+    Each connection gets a bounded buffer; a consumer that falls
+    `buffer_size` events behind is evicted (its stream is closed and the
+    client reconnects and re-reads the list) instead of letting its backlog
+    grow without bound.
+    """
+
+    def __init__(
+        self,
+        backend: HubBackend,
+        buffer_size: int = 100,
+        heartbeat_interval: float = 15.0,
+    ):
+        self.backend = backend
+        self.buffer_size = buffer_size
+        self.heartbeat_interval = heartbeat_interval
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {"published": 0, "delivered": 0, "evicted": 0}
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self.backend.start(self._deliver_threadsafe)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                self.unsubscribe(subscription)
+        self._loop = None
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.buffer_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+        subscription.close()
+
+    def publish(self, event: dict, user_ids: Optional[Iterable[int]] = None) -> None:
+        """Send `event` to `user_ids` (None: every connected user). Thread-safe."""
+        self._stats["published"] += 1
+        message = {
+            "user_ids": None if user_ids is None else list(user_ids),
+            "event": event,
+        }
+        self.backend.publish(message)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "connections": sum(len(s) for s in self._subscriptions.values()),
+            "users": len(self._subscriptions),
+        }
+
+    def _deliver_threadsafe(self, message: Message) -> None:
+        loop = self._loop
+        if loop is None:
+            return  # not started (scripts, tests): nobody is connected
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(message)
+        else:
+            loop.call_soon_threadsafe(self._deliver, message)
+
+    def _deliver(self, message: Message) -> None:
+        user_ids = message.get("user_ids")
+        if user_ids is None:
+            targets = [s for subs in self._subscriptions.values() for s in subs]
+        else:
+            targets = [
+                s for user_id in user_ids for s in self._subscriptions.get(user_id, ())
+            ]
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(message["event"])
+                self._stats["delivered"] += 1
+            except asyncio.QueueFull:
+                subscription.evicted = True
+                self._stats["evicted"] += 1
+                self.unsubscribe(subscription)
+
+
+def _build_backend() -> HubBackend:
+    name = config("NOTIFICATION_HUB_BACKEND", default="local")
+    if name == "postgres":
+        return PostgresNotifyBackend(ASYNC_DATABASE_URL)
+    return LocalBackend()
+
+
+notification_hub = NotificationHub(
+    backend=_build_backend(),
+    buffer_size=config("NOTIFICATION_STREAM_BUFFER_SIZE", default=100, cast=int),
+    heartbeat_interval=config(
+        "NOTIFICATION_STREAM_HEARTBEAT", default=15.0, cast=float
+    ),
+)
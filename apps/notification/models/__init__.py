@@ -2,10 +2,12 @@ from .notification import (
     Notification,
     NotificationTypeChoices,
     UserNotification,
+    UserNotificationState,
 )
 
 __all__ = [
     "Notification",
     "UserNotification",
+    "UserNotificationState",
     "NotificationTypeChoices",
 ]
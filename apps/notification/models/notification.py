@@ -1,6 +1,16 @@
 import enum
 
-from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    false,
+)
 from sqlalchemy.orm import relationship
 
 from base.models import BaseModel
@@ -24,6 +34,11 @@ class Notification(BaseModel):
         nullable=False,
         default=NotificationTypeChoices.SYSTEM,
     )
+    # Broadcasts have no per-user rows; they're merged in at read time
+    # (see UserNotificationState and service.user_notifications_query)
+    is_broadcast = Column(
+        Boolean, default=False, server_default=false(), nullable=False
+    )
     # Relationships
     user_notifications = relationship(
         "UserNotification",
@@ -31,6 +46,15 @@ class Notification(BaseModel):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        Index(
+            "ix_notifications_broadcast_id",
+            "id",
+            postgresql_where=is_broadcast,
+            sqlite_where=is_broadcast,
+        ),
+    )
+
 
 class UserNotification(BaseModel):
     __tablename__ = "user_notifications"
@@ -45,3 +69,32 @@ class UserNotification(BaseModel):
     # Relationships
     user = relationship("User", back_populates="user_notifications")
     notification = relationship("Notification", back_populates="user_notifications")
+
+    # One row per (user, notification): a delivered notification, or the
+    # read override of a broadcast
+    __table_args__ = (
+        Index(
+            "uq_user_notifications_user_notification",
+            "user_id",
+            "notification_id",
+            unique=True,
+        ),
+    )
+
+
+class UserNotificationState(BaseModel):
+    __tablename__ = "user_notification_states"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False
+    )
+    # Broadcasts with id <= this are read unless a UserNotification overrides it
+    last_seen_broadcast_id = Column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    # Unread badge, kept incrementally (fan-out / mark-read):
+    # unread delivered rows, and read overrides of broadcasts above the watermark
+    unread_count = Column(Integer, default=0, server_default="0", nullable=False)
+    broadcast_read_count = Column(
+        Integer, default=0, server_default="0", nullable=False
+    )
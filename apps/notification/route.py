@@ -0,0 +1,277 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from apps.authentication.authentication import (
+    Principal,
+    check_permissions,
+    get_current_active_principal,
+    principal_from_token,
+)
+from apps.database import SessionLocal, get_db
+from apps.metrics.queries import query_budget
+from base.pagination import get_cursor_pagination_params, paginate
+from base.route import StandardJSONResponse, StandardResponse
+
+from .hub import notification_hub
+from .schemas import NotificationMarkReadSchema, UserNotificationItemSchema
+from .service import (
+    count_unread,
+    fanout_registry,
+    mark_all_read,
+    mark_read,
+    user_notifications_query,
+)
+
+router = APIRouter()
+# streams also accept ?token=..., browsers can't set headers on EventSource/WebSocket
+stream_security = HTTPBearer(auto_error=False)
+
+
+@router.get("/list", response_model=StandardResponse)
+@query_budget(2)  # page (+ count with ?cursor=false)
+def list_notifications(
+    is_read: Optional[bool] = None,
+    current_user: Principal = Depends(get_current_active_principal),
+    db: Session = Depends(get_db),
+    pagination=Depends(get_cursor_pagination_params),
+):
+    """
+    Notifications of the current user, newest first. Cursor paginated by
+    default: an exact count over the union is only run for ?cursor=false.
+    """
+    notifications = user_notifications_query(current_user.id).subquery()
+    query = db.query(notifications)
+    if is_read is not None:
+        query = query.filter(notifications.c.is_read == is_read)
+    result = paginate(
+        query=query.order_by(notifications.c.id.desc()),
+        pagination=pagination,
+        schema=UserNotificationItemSchema,
+        keyset=(notifications.c.id,),
+        descending=True,
+        as_rows=True,
+    )
+    return StandardJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data=result.data,
+            message="Notifications fetched successfully.",
+            meta=result.meta,
+        ),
+    )
+
+
+@router.get("/unread-count", response_model=StandardResponse)
+def get_unread_count(
+    current_user: Principal = Depends(get_current_active_principal),
+    db: Session = Depends(get_db),
+):
+    """Unread badge count, from the incrementally maintained counters"""
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data={"unread": count_unread(db, current_user.id)},
+            message="Unread count fetched successfully.",
+        ).model_dump(),
+    )
+
+
+@router.post("/read", response_model=StandardResponse)
+def mark_notifications_read(
+    payload: NotificationMarkReadSchema,
+    current_user: Principal = Depends(get_current_active_principal),
+    db: Session = Depends(get_db),
+):
+    """Mark several notifications as read"""
+    updated = mark_read(db, current_user.id, payload.notification_ids)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data={"updated": updated},
+            message="Notifications marked as read.",
+        ).model_dump(),
+    )
+
+
+@router.post("/read-all", response_model=StandardResponse)
+def mark_all_notifications_read(
+    current_user: Principal = Depends(get_current_active_principal),
+    db: Session = Depends(get_db),
+):
+    """Mark every notification of the current user as read"""
+    mark_all_read(db, current_user.id)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data=None,
+            message="All notifications marked as read.",
+        ).model_dump(),
+    )
+
+
+@router.post("/{notification_id}/read", response_model=StandardResponse)
+def mark_notification_read(
+    notification_id: int,
+    current_user: Principal = Depends(get_current_active_principal),
+    db: Session = Depends(get_db),
+):
+    """Mark one notification as read"""
+    notifications = user_notifications_query(current_user.id).subquery()
+    visible = db.scalar(
+        select(notifications.c.id).where(notifications.c.id == notification_id)
+    )
+    if visible is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content=StandardResponse.error_response(
+                message="Notification not found."
+            ).model_dump(),
+        )
+    mark_read(db, current_user.id, [notification_id])
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data=None,
+            message="Notification marked as read.",
+        ).model_dump(),
+    )
+
+
+@router.get("/fanout", response_model=StandardResponse)
+def list_fanouts(
+    current_user: Principal = Depends(check_permissions(["can_create_stock"])),
+):
+    """Progress of recent notification fan-outs (this process), newest first"""
+    return StandardJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data=fanout_registry.all(),
+            message="Fan-outs fetched successfully.",
+        ),
+    )
+
+
+@router.get("/fanout/{notification_id}", response_model=StandardResponse)
+def retrieve_fanout(
+    notification_id: int,
+    current_user: Principal = Depends(check_permissions(["can_create_stock"])),
+):
+    """Progress of one notification fan-out"""
+    progress = fanout_registry.get(notification_id)
+    if progress is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content=StandardResponse.error_response(
+                message="Fan-out not found."
+            ).model_dump(),
+        )
+    return StandardJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data=progress,
+            message="Fan-out fetched successfully.",
+        ),
+    )
+
+
+def _stream_principal(token: Optional[str]) -> Principal:
+    # own short-lived session: a stream must not hold a pooled connection
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated"
+        )
+    db = SessionLocal()
+    try:
+        principal = principal_from_token(token, db)
+    finally:
+        db.close()
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
+@router.get("/stream")
+async def stream_notifications(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(stream_security),
+):
+    """Server-sent events: new notifications as they are created, plus heartbeats"""
+    principal = await run_in_threadpool(
+        _stream_principal, credentials.credentials if credentials else token
+    )
+    subscription = notification_hub.subscribe(principal.id)
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            async for event in subscription.events(notification_hub.heartbeat_interval):
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+            if subscription.evicted:
+                # fell too far behind; the client reconnects and re-reads /list
+                yield "event: evicted\ndata: {}\n\n"
+        finally:
+            notification_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/stream")
+async def stream_notifications_ws(websocket: WebSocket, token: Optional[str] = None):
+    """WebSocket variant of /stream (JSON messages, {"type": "ping"} heartbeats)"""
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        principal = await run_in_threadpool(_stream_principal, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = notification_hub.subscribe(principal.id)
+
+    async def receive():
+        # nothing is expected from the client; this only notices the close
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        finally:
+            notification_hub.unsubscribe(subscription)
+
+    receiver = asyncio.create_task(receive())
+    try:
+        async for event in subscription.events(notification_hub.heartbeat_interval):
+            await websocket.send_json(event if event is not None else {"type": "ping"})
+        if subscription.evicted:
+            await websocket.close(
+                code=status.WS_1013_TRY_AGAIN_LATER, reason="Slow consumer"
+            )
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # closed while sending
+    finally:
+        receiver.cancel()
+        notification_hub.unsubscribe(subscription)
@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 from .models import NotificationTypeChoices
 
@@ -43,3 +43,21 @@ class UserNotificationListSchema(BaseModel):
     read_at: Optional[datetime]
     created_at: datetime
     updated_at: datetime
+
+
+class UserNotificationItemSchema(BaseModel):
+    """A notification as one user sees it (delivered or broadcast)"""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    message: str
+    notification_type: NotificationTypeChoices
+    created_at: datetime
+    is_read: bool
+    read_at: Optional[datetime] = None
+
+
+class NotificationMarkReadSchema(BaseModel):
+    notification_ids: List[int] = Field(min_length=1, max_length=500)
@@ -1,55 +1,465 @@
-from fastapi import Depends
-from sqlalchemy import select
+import enum
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from decouple import Csv, config
+from fastapi import BackgroundTasks
+from sqlalchemy import (
+    CompoundSelect,
+    and_,
+    delete,
+    false,
+    func,
+    insert,
+    literal,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 
 from apps.authentication.models import User
-from apps.database import get_db
+from apps.database import SessionLocal
+
+from .hub import notification_hub
+from .models import (
+    Notification,
+    NotificationTypeChoices,
+    UserNotification,
+    UserNotificationState,
+)
+from .schemas import NotificationCreateSchema, UserNotificationItemSchema
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryMode(str, enum.Enum):
+    FAN_OUT_ON_WRITE = "write"  # one user_notifications row per recipient
+    FAN_OUT_ON_READ = "read"  # one broadcast row, merged in at read time
+
+
+# Notification types delivered as broadcasts (fan-out-on-read). None by
+# default: every notification, create_stock's included, gets its
+# user_notifications rows from fan_out_notification.
+BROADCAST_TYPES = {
+    NotificationTypeChoices(value)
+    for value in config("NOTIFICATION_BROADCAST_TYPES", default="", cast=Csv())
+}
+
+
+def get_delivery_mode(notification_type: NotificationTypeChoices) -> DeliveryMode:
+    if notification_type in BROADCAST_TYPES:
+        return DeliveryMode.FAN_OUT_ON_READ
+    return DeliveryMode.FAN_OUT_ON_WRITE
+
+
+class FanOutStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
 
-from .models import Notification, NotificationTypeChoices, UserNotification
-from .schemas import NotificationCreateSchema
+
+@dataclass
+class FanOutProgress:
+    notification_id: int
+    status: FanOutStatus = FanOutStatus.PENDING
+    total: Optional[int] = None  # active users when the fan-out started
+    delivered: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class FanOutRegistry:
+    """Progress of recent fan-outs (in memory, per process, newest last)"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[int, FanOutProgress]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, notification_id: int) -> FanOutProgress:
+        progress = FanOutProgress(notification_id=notification_id)
+        with self._lock:
+            self._data[notification_id] = progress
+            self._data.move_to_end(notification_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return progress
+
+    def get(self, notification_id: int) -> Optional[FanOutProgress]:
+        return self._data.get(notification_id)
+
+    def all(self) -> list[FanOutProgress]:
+        with self._lock:
+            return list(reversed(self._data.values()))
+
+
+fanout_registry = FanOutRegistry(
+    maxsize=config("NOTIFICATION_FANOUT_HISTORY", default=100, cast=int)
+)
+FANOUT_CHUNK_SIZE = config("NOTIFICATION_FANOUT_CHUNK_SIZE", default=10_000, cast=int)
 
 
 def create_notification_for_all_users(
     db: Session,
     notification: NotificationCreateSchema,
+    background_tasks: BackgroundTasks,
 ) -> Notification:
-    """Create a notification and send it to all active users"""
-
-    print(
-        f"[DEBUG] Creating notification with title: {notification.title}, message: {notification.message}"
-    )
+    """
+    Create a notification and deliver it to all active users.
 
-    # Create the notification
+    Broadcast types (see BROADCAST_TYPES) are a single row that every user
+    sees at read time. Other types get UserNotification rows, inserted by
+    `fan_out_notification` after the response is sent; only the Notification
+    row is written in the caller's transaction.
+    """
+    mode = get_delivery_mode(notification.notification_type)
     notification = Notification(
         message=notification.message,
         notification_type=notification.notification_type,
         title=notification.title,
+        is_broadcast=mode == DeliveryMode.FAN_OUT_ON_READ,
     )
     db.add(notification)
     db.flush()  # Get the notification ID
-    print(f"[DEBUG] Notification created with ID: {notification.id}")
-
-    # Get all active users
-    result = db.execute(select(User).filter(User.is_active))
-    active_users = result.scalars().all()
-    print(f"[DEBUG] Found {len(active_users)} active users")
-
-    # Create user notifications for each active user
-    user_notifications = [
-        UserNotification(
-            user_id=user.id,
-            notification_id=notification.id,
-            is_read=False,
+    if mode == DeliveryMode.FAN_OUT_ON_READ:
+        # pushed to connected clients once the caller has committed
+        background_tasks.add_task(publish_notification, notification.id)
+        return notification  # committed by caller
+
+    fanout_registry.add(notification.id)
+    background_tasks.add_task(fan_out_notification, notification.id)
+    return notification  # committed by caller
+
+
+def notification_event(notification: Notification) -> dict:
+    """Stream event for a new notification (same shape as the list items)"""
+    item = UserNotificationItemSchema(
+        id=notification.id,
+        title=notification.title,
+        message=notification.message,
+        notification_type=notification.notification_type,
+        created_at=notification.created_at,
+        is_read=False,
+    )
+    return {"type": "notification", "data": item.model_dump(mode="json")}
+
+
+def publish_notification(notification_id: int) -> None:
+    """Push a committed broadcast to every connected user"""
+    db = SessionLocal()
+    try:
+        notification = db.get(Notification, notification_id)
+        if notification is not None:
+            notification_hub.publish(notification_event(notification))
+    finally:
+        db.close()
+
+
+def _active_users_after(last_id: int):
+    return select(User.id).where(User.is_active, User.id > last_id)
+
+
+def fan_out_notification(
+    notification_id: int, chunk_size: int = FANOUT_CHUNK_SIZE
+) -> FanOutProgress:
+    """
+    Deliver a notification to every active user with
+    INSERT INTO user_notifications ... SELECT id FROM users WHERE is_active,
+    in user-id ranges of `chunk_size` (0 = one statement). Each range is its
+    own short transaction, so progress is visible and locks stay brief.
+    Runs on its own session, outside any request.
+    """
+    progress = fanout_registry.get(notification_id) or fanout_registry.add(
+        notification_id
+    )
+    progress.status = FanOutStatus.RUNNING
+    progress.started_at = datetime.now(timezone.utc)
+
+    db = SessionLocal()
+    try:
+        notification = db.get(Notification, notification_id)
+        if notification is None:
+            # the creating transaction was rolled back
+            raise LookupError(f"Notification {notification_id} does not exist")
+        event = notification_event(notification)
+
+        progress.total = db.scalar(
+            select(func.count()).select_from(_active_users_after(0).subquery())
         )
-        for user in active_users
-    ]
+        last_id = 0
+        while True:
+            users = _active_users_after(last_id)
+            upper = None
+            if chunk_size > 0:
+                upper = db.scalar(
+                    users.order_by(User.id).offset(chunk_size - 1).limit(1)
+                )
+            if upper is not None:
+                users = users.where(User.id <= upper)
+
+            result = db.execute(
+                insert(UserNotification).from_select(
+                    ["user_id", "notification_id", "is_read", "is_deleted"],
+                    users.with_only_columns(
+                        User.id, literal(notification_id), false(), false()
+                    ),
+                )
+            )
+            # keep existing unread badges in step; users without a state row
+            # get an exact count when it is created
+            db.execute(
+                update(UserNotificationState)
+                .where(UserNotificationState.user_id.in_(users))
+                .values(unread_count=UserNotificationState.unread_count + 1)
+            )
+            db.commit()
+            progress.delivered += result.rowcount
+            if upper is None:
+                break
+            last_id = upper
 
-    db.add_all(user_notifications)
-    # db.commit()# don't commit yet
-    print(f"[DEBUG] Created {len(user_notifications)} user notifications")
+        progress.status = FanOutStatus.COMPLETED
+        notification_hub.publish(event)  # every connected user is a recipient
+    except Exception as error:
+        db.rollback()
+        progress.status = FanOutStatus.FAILED
+        progress.error = str(error)
+        logger.exception("Fan-out of notification %s failed", notification_id)
+    finally:
+        db.close()
+        progress.finished_at = datetime.now(timezone.utc)
+    return progress
 
-    return notification  # now committed automatically by caller
+
+def user_notifications_query(user_id: int) -> CompoundSelect:
+    """
+    Notifications of `user_id` with their effective read state: delivered
+    rows, plus the broadcasts sent since the user joined. A broadcast is read
+    when the user has a UserNotification override for it, or otherwise when
+    its id is at or below the user's last_seen_broadcast_id watermark.
+
+    Columns: id, title, message, notification_type, created_at, is_read,
+    read_at (select from it as a subquery to filter/order/paginate).
+    """
+    delivered = (
+        select(
+            Notification.id,
+            Notification.title,
+            Notification.message,
+            Notification.notification_type,
+            Notification.created_at,
+            UserNotification.is_read,
+            UserNotification.read_at,
+        )
+        .join(UserNotification, UserNotification.notification_id == Notification.id)
+        .where(
+            UserNotification.user_id == user_id, Notification.is_broadcast.is_(False)
+        )
+    )
+
+    override = aliased(UserNotification)
+    watermark = (
+        select(UserNotificationState.last_seen_broadcast_id)
+        .where(UserNotificationState.user_id == user_id)
+        .scalar_subquery()
+    )
+    joined_at = select(User.created_at).where(User.id == user_id).scalar_subquery()
+    broadcasts = (
+        select(
+            Notification.id,
+            Notification.title,
+            Notification.message,
+            Notification.notification_type,
+            Notification.created_at,
+            func.coalesce(
+                override.is_read, Notification.id <= func.coalesce(watermark, 0)
+            ).label("is_read"),
+            override.read_at,
+        )
+        .outerjoin(
+            override,
+            and_(
+                override.notification_id == Notification.id, override.user_id == user_id
+            ),
+        )
+        .where(Notification.is_broadcast, Notification.created_at >= joined_at)
+    )
+    return union_all(delivered, broadcasts)
+
+
+def get_notification_state(db: Session, user_id: int) -> UserNotificationState:
+    """
+    The user's broadcast watermark and unread counters, created on first use
+    with exact counts (the watermark starts at the last broadcast sent before
+    the user joined).
+    """
+    state = db.scalar(
+        select(UserNotificationState).where(UserNotificationState.user_id == user_id)
+    )
+    if state is not None:
+        return state
+
+    joined_at = select(User.created_at).where(User.id == user_id).scalar_subquery()
+    watermark = db.scalar(
+        select(func.coalesce(func.max(Notification.id), 0)).where(
+            Notification.is_broadcast, Notification.created_at < joined_at
+        )
+    )
+    state = UserNotificationState(
+        user_id=user_id,
+        last_seen_broadcast_id=watermark,
+        unread_count=db.scalar(
+            select(func.count())
+            .select_from(UserNotification)
+            .join(Notification, Notification.id == UserNotification.notification_id)
+            .where(
+                UserNotification.user_id == user_id,
+                UserNotification.is_read.is_(False),
+                Notification.is_broadcast.is_(False),
+            )
+        ),
+        broadcast_read_count=db.scalar(
+            select(func.count())
+            .select_from(UserNotification)
+            .join(Notification, Notification.id == UserNotification.notification_id)
+            .where(
+                UserNotification.user_id == user_id,
+                UserNotification.is_read,
+                Notification.is_broadcast,
+                Notification.id > watermark,
+            )
+        ),
+    )
+    db.add(state)
+    try:
+        db.commit()
+    except IntegrityError:
+        # created concurrently by another request
+        db.rollback()
+        state = db.scalar(
+            select(UserNotificationState).where(
+                UserNotificationState.user_id == user_id
+            )
+        )
+    return state
+
+
+def count_unread(db: Session, user_id: int) -> int:
+    """
+    Unread badge: the stored counters plus broadcasts above the watermark
+    (a count over the partial broadcast index, only unseen broadcasts).
+    """
+    state = get_notification_state(db, user_id)
+    unseen_broadcasts = db.scalar(
+        select(func.count())
+        .select_from(Notification)
+        .where(
+            Notification.is_broadcast,
+            Notification.id > state.last_seen_broadcast_id,
+        )
+    )
+    return max(state.unread_count + unseen_broadcasts - state.broadcast_read_count, 0)
+
+
+def mark_read(db: Session, user_id: int, notification_ids: list[int]) -> int:
+    """Mark notifications of `user_id` as read; returns how many changed"""
+    state = get_notification_state(db, user_id)
+    now = datetime.now(timezone.utc)
+
+    # delivered rows (broadcast overrides are always is_read=True)
+    delivered = db.execute(
+        update(UserNotification)
+        .where(
+            UserNotification.user_id == user_id,
+            UserNotification.notification_id.in_(notification_ids),
+            UserNotification.is_read.is_(False),
+        )
+        .values(is_read=True, read_at=now)
+    ).rowcount
+
+    # unseen broadcasts get a sparse read override
+    overridden = select(UserNotification.notification_id).where(
+        UserNotification.user_id == user_id,
+        UserNotification.notification_id.in_(notification_ids),
+    )
+    broadcast_ids = db.scalars(
+        select(Notification.id).where(
+            Notification.id.in_(notification_ids),
+            Notification.is_broadcast,
+            Notification.id > state.last_seen_broadcast_id,
+            Notification.id.not_in(overridden),
+        )
+    ).all()
+    if broadcast_ids:
+        db.execute(
+            insert(UserNotification),
+            [
+                {
+                    "user_id": user_id,
+                    "notification_id": notification_id,
+                    "is_read": True,
+                    "read_at": now,
+                    "is_deleted": False,
+                }
+                for notification_id in broadcast_ids
+            ],
+        )
+
+    state.unread_count = UserNotificationState.unread_count - delivered
+    state.broadcast_read_count = UserNotificationState.broadcast_read_count + len(
+        broadcast_ids
+    )
+    db.commit()
+    return delivered + len(broadcast_ids)
+
+
+def mark_all_read(db: Session, user_id: int) -> int:
+    """
+    Mark everything of `user_id` as read: delivered rows are updated, and the
+    broadcast watermark moves to the latest broadcast (its overrides are no
+    longer needed and are dropped). Returns how many delivered rows changed.
+    """
+    state = get_notification_state(db, user_id)
+    delivered = db.execute(
+        update(UserNotification)
+        .where(
+            UserNotification.user_id == user_id,
+            UserNotification.is_read.is_(False),
+        )
+        .values(is_read=True, read_at=datetime.now(timezone.utc))
+    ).rowcount
+
+    latest = db.scalar(
+        select(func.coalesce(func.max(Notification.id), 0)).where(
+            Notification.is_broadcast
+        )
+    )
+    watermark = max(latest, state.last_seen_broadcast_id)
+    db.execute(
+        delete(UserNotification).where(
+            UserNotification.user_id == user_id,
+            UserNotification.notification_id.in_(
+                select(Notification.id).where(
+                    Notification.is_broadcast, Notification.id <= watermark
+                )
+            ),
+        )
+    )
+
+    state.last_seen_broadcast_id = watermark
+    state.unread_count = UserNotificationState.unread_count - delivered
+    state.broadcast_read_count = 0
+    db.commit()
+    return delivered
 
 
 async def create_notification_for_user(
@@ -73,7 +483,13 @@ async def create_notification_for_user(
         is_read=False,
     )
     db.add(user_notification)
+    await db.execute(
+        update(UserNotificationState)
+        .where(UserNotificationState.user_id == user_id)
+        .values(unread_count=UserNotificationState.unread_count + 1)
+    )
     await db.commit()
     await db.refresh(notification)
+    notification_hub.publish(notification_event(notification), user_ids=[user_id])
 
     return notification
@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.authentication.authentication import Principal, check_permissions_async
+from apps.database import get_async_db
+from apps.metrics.queries import query_budget
+from base.pagination import get_pagination_params, paginate_async
+from base.route import StandardResponse
+
+from .history import (
+    STOCK_HISTORY_DEFAULT_LIMIT,
+    STOCK_HISTORY_MAX_LIMIT,
+    history_page,
+    history_slice_query,
+)
+from .models import Stock
+from .schema import (
+    StockHistoryListSchema,
+    StockHistoryRetrieveSchema,
+    StockListSchema,
+    StockRetrieveSchema,
+)
+
+# Async (AsyncSession) variants of the hot stock endpoints, mounted under /api/v2
+router = APIRouter()
+
+
+@router.get("/list", response_model=StandardResponse)
+@query_budget(2)  # count, page
+async def list_stocks(
+    db: AsyncSession = Depends(get_async_db),
+    pagination=Depends(get_pagination_params),
+):
+    """List all stocks"""
+    result = await paginate_async(
+        db=db,
+        query=select(Stock).order_by(Stock.id),
+        pagination=pagination,
+        schema=StockListSchema,
+    )
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data=result.data,
+            message="Stock fetched successfully.",
+            meta=result.meta,
+        ).model_dump(),
+    )
+
+
+@router.get("/retrieve/{stock_id}", response_model=StandardResponse)
+@query_budget(2)  # stock, history slice
+async def retrieve_stock(
+    stock_id: int,
+    history_limit: int = Query(
+        STOCK_HISTORY_DEFAULT_LIMIT, ge=1, le=STOCK_HISTORY_MAX_LIMIT
+    ),
+    history_since: Optional[datetime] = None,
+    history_cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(check_permissions_async(["can_view_stock"])),
+):
+    """Retrieve a stock by ID with a slice of its price history, newest first"""
+    # the same bounded keyset slice as v1: never the whole history
+    db_stock = await db.scalar(select(Stock).where(Stock.id == stock_id))
+
+    if not db_stock:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content=StandardResponse.error_response(
+                message="Stock not found."
+            ).model_dump(),
+        )
+
+    rows, next_cursor = history_page(
+        (
+            await db.execute(
+                history_slice_query(
+                    stock_id, history_limit, history_since, history_cursor
+                )
+            )
+        ).all(),
+        history_limit,
+    )
+
+    data = StockHistoryRetrieveSchema(
+        **StockRetrieveSchema.model_validate(db_stock).model_dump(),
+        history=[StockHistoryListSchema.model_validate(row) for row in rows],
+        history_next_cursor=next_cursor,
+    )
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data=data.model_dump(mode="json"),
+            message="Stock retrieved successfully.",
+        ).model_dump(),
+    )
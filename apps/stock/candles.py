@@ -0,0 +1,99 @@
+import enum
+from datetime import datetime, timedelta
+
+from sqlalchemy import Select, case, func, select
+
+from .models import StockHistory
+
+
+class CandleInterval(str, enum.Enum):
+    MINUTE = "1m"
+    HOUR = "1h"
+    DAY = "1d"
+
+
+INTERVAL_LENGTHS = {
+    CandleInterval.MINUTE: timedelta(minutes=1),
+    CandleInterval.HOUR: timedelta(hours=1),
+    CandleInterval.DAY: timedelta(days=1),
+}
+# default window when `from` is omitted
+DEFAULT_RANGES = {
+    CandleInterval.MINUTE: timedelta(days=1),
+    CandleInterval.HOUR: timedelta(days=7),
+    CandleInterval.DAY: timedelta(days=365),
+}
+
+_DATE_TRUNC_UNITS = {
+    CandleInterval.MINUTE: "minute",
+    CandleInterval.HOUR: "hour",
+    CandleInterval.DAY: "day",
+}
+_STRFTIME_FORMATS = {
+    CandleInterval.MINUTE: "%Y-%m-%d %H:%M:00",
+    CandleInterval.HOUR: "%Y-%m-%d %H:00:00",
+    CandleInterval.DAY: "%Y-%m-%d 00:00:00",
+}
+
+
+def bucket_expression(column, interval: CandleInterval, dialect_name: str):
+    """Start of the `interval` bucket containing `column`, computed by the database"""
+    if dialect_name == "sqlite":
+        return func.strftime(_STRFTIME_FORMATS[interval], column)
+    # day buckets start at UTC midnight, not in the session's TimeZone;
+    # naive UTC like the SQLite buckets
+    return func.date_trunc(
+        _DATE_TRUNC_UNITS[interval], column.op("AT TIME ZONE")("UTC")
+    )
+
+
+def candles_query(
+    stock_id: int,
+    interval: CandleInterval,
+    start: datetime,
+    end: datetime,
+    dialect_name: str,
+) -> Select:
+    """
+    OHLC + count per bucket for one stock, entirely in SQL: two row_number()
+    windows pick the first and last price of each bucket, then a GROUP BY
+    folds every bucket into one row. Served by the (stock_id, created_at)
+    index; no ORM rows are built.
+    """
+    bucket = bucket_expression(StockHistory.created_at, interval, dialect_name)
+    ranked = (
+        select(
+            bucket.label("bucket"),
+            StockHistory.price,
+            func.row_number()
+            .over(
+                partition_by=bucket,
+                order_by=(StockHistory.created_at.asc(), StockHistory.id.asc()),
+            )
+            .label("first_rank"),
+            func.row_number()
+            .over(
+                partition_by=bucket,
+                order_by=(StockHistory.created_at.desc(), StockHistory.id.desc()),
+            )
+            .label("last_rank"),
+        )
+        .where(
+            StockHistory.stock_id == stock_id,
+            StockHistory.created_at >= start,
+            StockHistory.created_at < end,
+        )
+        .subquery()
+    )
+    return (
+        select(
+            ranked.c.bucket,
+            func.max(case((ranked.c.first_rank == 1, ranked.c.price))).label("open"),
+            func.max(ranked.c.price).label("high"),
+            func.min(ranked.c.price).label("low"),
+            func.max(case((ranked.c.last_rank == 1, ranked.c.price))).label("close"),
+            func.count().label("count"),
+        )
+        .group_by(ranked.c.bucket)
+        .order_by(ranked.c.bucket)
+    )
@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from decouple import config
+from sqlalchemy import Select, select, tuple_
+
+from base.pagination import decode_cursor, encode_cursor
+
+from .models import StockHistory
+
+STOCK_HISTORY_DEFAULT_LIMIT = config(
+    "STOCK_HISTORY_DEFAULT_LIMIT", default=50, cast=int
+)
+STOCK_HISTORY_MAX_LIMIT = config("STOCK_HISTORY_MAX_LIMIT", default=500, cast=int)
+
+_KEYSET = (StockHistory.created_at, StockHistory.id)
+
+
+def history_slice_query(
+    stock_id: int,
+    limit: int,
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+) -> Select:
+    """
+    One page of a stock's price history, newest first, keyset paginated on
+    (created_at, id). Fetches one extra row to tell whether a next page
+    exists; pass the rows to history_page().
+    """
+    query = (
+        select(
+            StockHistory.stock_id,
+            StockHistory.price,
+            StockHistory.created_at,
+            StockHistory.id,
+        )
+        .where(StockHistory.stock_id == stock_id)
+        .order_by(StockHistory.created_at.desc(), StockHistory.id.desc())
+        .limit(limit + 1)
+    )
+    if since is not None:
+        query = query.where(StockHistory.created_at >= since)
+    if cursor:
+        values = decode_cursor(cursor, len(_KEYSET))
+        query = query.where(tuple_(*_KEYSET) < tuple_(*values))
+    return query
+
+
+def history_page(rows: Sequence, limit: int) -> Tuple[List, Optional[str]]:
+    """(rows of the page, cursor of the next page or None)"""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([rows[-1].created_at, rows[-1].id])
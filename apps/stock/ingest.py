@@ -0,0 +1,200 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from decouple import config
+from sqlalchemy import Integer, String, column, func, insert, select, update, values
+from sqlalchemy.orm import Session
+
+from base.cache import response_cache
+
+from .models import Stock, StockHistory
+from .schema import StockPriceTickSchema
+
+INGEST_BATCH_SIZE = config("STOCK_INGEST_BATCH_SIZE", default=5000, cast=int)
+
+
+class SymbolCache:
+    """
+    symbol -> stock id (per process). Misses are resolved with one IN query
+    per batch; a renamed stock must be invalidated (update_stock does).
+    """
+
+    def __init__(self):
+        self._data: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, db: Session, symbols: Iterable[str]) -> Dict[str, int]:
+        symbols = set(symbols)
+        with self._lock:
+            found = {s: self._data[s] for s in symbols if s in self._data}
+        missing = symbols - found.keys()
+        if missing:
+            rows = db.execute(
+                select(Stock.symbol, Stock.id).where(Stock.symbol.in_(missing))
+            ).all()
+            loaded = {symbol: stock_id for symbol, stock_id in rows}
+            with self._lock:
+                self._data.update(loaded)
+            found.update(loaded)
+        return found
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        with self._lock:
+            if symbol is None:
+                self._data.clear()
+            else:
+                self._data.pop(symbol, None)
+
+
+symbol_cache = SymbolCache()
+
+
+@dataclass
+class IngestResult:
+    received: int = 0
+    updated: int = 0  # stocks whose price changed
+    history: int = 0  # stock_history rows written
+    stale: int = 0  # ticks older than the stock's latest, kept as history only
+    unknown_symbols: List[str] = field(default_factory=list)
+
+    def merge(self, other: "IngestResult") -> None:
+        self.received += other.received
+        self.updated += other.updated
+        self.history += other.history
+        self.stale += other.stale
+        self.unknown_symbols.extend(
+            s for s in other.unknown_symbols if s not in self.unknown_symbols
+        )
+
+
+def _last_updated(ts: datetime) -> str:
+    """Stock.last_updated format: naive local time, like the column default"""
+    return ts.astimezone().replace(tzinfo=None).isoformat()
+
+
+def _update_prices(db: Session, changes: Dict[int, tuple]) -> None:
+    """One UPDATE for every changed stock: new price and last tick time"""
+    now = func.now()
+    if db.get_bind().dialect.name == "postgresql":
+        # UPDATE stocks SET ... FROM (VALUES (id, price, ts), ...) AS v
+        rows = values(
+            column("id", Integer),
+            column("price", Integer),
+            column("last_updated", String),
+            name="v",
+        ).data(
+            [
+                (stock_id, price, _last_updated(ts))
+                for stock_id, (price, ts) in changes.items()
+            ]
+        )
+        db.execute(
+            update(Stock)
+            .where(Stock.id == rows.c.id)
+            .values(
+                price=rows.c.price, last_updated=rows.c.last_updated, updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        # executemany keyed on the primary key
+        db.execute(
+            update(Stock),
+            [
+                {
+                    "id": stock_id,
+                    "price": price,
+                    "last_updated": _last_updated(ts),
+                    "updated_at": datetime.now(timezone.utc),
+                }
+                for stock_id, (price, ts) in changes.items()
+            ],
+        )
+
+
+def ingest_prices(db: Session, ticks: Sequence[StockPriceTickSchema]) -> IngestResult:
+    """
+    Apply one batch of price ticks in a single transaction: lock the touched
+    stocks, write a history row for every tick that changes the price, move
+    each stock to its latest price with one UPDATE, commit once. A tick older
+    than the stock's latest history row arrived late: it is recorded in the
+    history but never moves the price.
+    """
+    result = IngestResult(received=len(ticks))
+    if not ticks:
+        return result
+
+    ids = symbol_cache.resolve(db, (tick.symbol for tick in ticks))
+    now = datetime.now(timezone.utc)
+    by_stock: Dict[int, List[tuple]] = {}
+    symbols: Dict[int, str] = {}
+    for tick in ticks:
+        stock_id = ids.get(tick.symbol)
+        if stock_id is None:
+            if tick.symbol not in result.unknown_symbols:
+                result.unknown_symbols.append(tick.symbol)
+            continue
+        ts = tick.ts or now
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        by_stock.setdefault(stock_id, []).append((ts, tick.price))
+        symbols[stock_id] = tick.symbol
+    if not by_stock:
+        return result
+
+    latest_tick = (
+        select(func.max(StockHistory.created_at))
+        .where(StockHistory.stock_id == Stock.id)
+        .scalar_subquery()
+    )
+    # id order keeps concurrent batches from deadlocking on each other
+    current = {
+        stock_id: (price, latest)
+        for stock_id, price, latest in db.execute(
+            select(Stock.id, Stock.price, latest_tick)
+            .where(Stock.id.in_(by_stock))
+            .order_by(Stock.id)
+            .with_for_update(of=Stock)
+        )
+    }
+
+    history = []
+    changes = {}
+    for stock_id, stock_ticks in by_stock.items():
+        if stock_id not in current:
+            # deleted since it was cached
+            symbol_cache.invalidate(symbols[stock_id])
+            result.unknown_symbols.append(symbols[stock_id])
+            continue
+        price, latest = current[stock_id]
+        if latest is not None and latest.tzinfo is None:
+            latest = latest.replace(tzinfo=timezone.utc)
+        stock_ticks.sort(key=lambda t: t[0])
+        for ts, new_price in stock_ticks:
+            if latest is not None and ts < latest:
+                history.append(
+                    {"stock_id": stock_id, "price": new_price, "created_at": ts}
+                )
+                result.stale += 1
+            elif new_price != price:
+                history.append(
+                    {"stock_id": stock_id, "price": new_price, "created_at": ts}
+                )
+                price = new_price
+                changes[stock_id] = (price, ts)
+
+    if changes:
+        _update_prices(db, changes)
+    if history:
+        db.execute(insert(StockHistory), history)
+    db.commit()
+    if history:
+        # late ticks change a stock's history (retrieve) but not its price (list)
+        tags = {f"stock:{row['stock_id']}" for row in history}
+        response_cache.invalidate(*(["stocks:list"] if changes else []), *tags)
+
+    result.updated = len(changes)
+    result.history = len(history)
+    return result
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from base.models import BaseModel
@@ -15,3 +15,8 @@ class StockHistory(BaseModel):
     price = Column(Integer, nullable=False)
 
     stock = relationship("Stock", back_populates="history")
+
+    # candles and history ranges: WHERE stock_id = ? AND created_at BETWEEN ...
+    __table_args__ = (
+        Index("ix_stock_history_stock_id_created_at", "stock_id", "created_at"),
+    )
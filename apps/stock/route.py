@@ -1,29 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Optional
+
+from decouple import config
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 
-from apps.authentication.models import User
-from apps.authentication.permissions.utils import check_permissions
+from apps.authentication.authentication import Principal, check_permissions
 from apps.database import get_db
+from apps.metrics.queries import query_budget
 from apps.notification.schemas import NotificationCreateSchema
 from apps.notification.service import create_notification_for_all_users
-from base.pagination import get_pagination_params, paginate
-from base.route import StandardResponse
+from base.cache import response_cache
+from base.conditional import get_validator, row_state
+from base.export import ExportParams, export_response, filter_created, get_export_params
+from base.pagination import (
+    get_list_adapter,
+    get_pagination_params,
+    get_schema_columns,
+    paginate,
+)
+from base.route import StandardJSONResponse, StandardResponse
 
+from .candles import DEFAULT_RANGES, INTERVAL_LENGTHS, CandleInterval, candles_query
+from .history import (
+    STOCK_HISTORY_DEFAULT_LIMIT,
+    STOCK_HISTORY_MAX_LIMIT,
+    history_page,
+    history_slice_query,
+)
+from .ingest import INGEST_BATCH_SIZE, IngestResult, ingest_prices, symbol_cache
 from .models import Stock, StockHistory
 from .schema import (
+    CandleSchema,
     StockCreateSchema,
+    StockHistoryListSchema,
     StockHistoryRetrieveSchema,
     StockListSchema,
+    StockPriceTickSchema,
     StockRetrieveSchema,
     StockUpdateSchema,
 )
 
 router = APIRouter()
 
+CANDLES_MAX_BUCKETS = config("CANDLES_MAX_BUCKETS", default=2000, cast=int)
+
 
 @router.get("/list", response_model=StandardResponse)
+@response_cache.cached("stocks:list", tags=("stocks:list",))
+@query_budget(2)  # count, page
 def list_stocks(
     # page: int = 1,  # we are passing page and page_size in paginate() directly
     # page_size: int = 1,
@@ -37,21 +76,24 @@ def list_stocks(
         # page_size=page_size,
         pagination=pagination,
         schema=StockListSchema,
+        keyset=(Stock.id,),
+        as_rows=True,
     )
 
-    return JSONResponse(
+    return StandardJSONResponse(
         status_code=status.HTTP_200_OK,
         content=StandardResponse.success_response(
             data=result.data,
             message="Stock fetched successfully.",
             meta=result.meta,
-        ).model_dump(),
+        ),
     )
 
 
 @router.post("/create", response_model=StandardResponse)
 def create_stock(
     stock: StockCreateSchema,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
     try:
@@ -66,7 +108,7 @@ def create_stock(
         )
         db.add(historical_price)
 
-        # create notification
+        # create notification (delivered to users after the response)
         try:
             create_notification_for_all_users(
                 db=db,
@@ -74,6 +116,7 @@ def create_stock(
                     title=f"New Stock Added-{db_stock.symbol}",
                     message=f"New stock created: {db_stock.symbol} - {db_stock.company_name} at price {db_stock.price}",
                 ),
+                background_tasks=background_tasks,
             )
         except Exception as notiff_error:
             # Log the exception in real application
@@ -87,6 +130,7 @@ def create_stock(
                 ).model_dump(),
             )
         db.commit()
+        response_cache.invalidate("stocks:list")
         db.refresh(db_stock)
 
         return JSONResponse(
@@ -143,17 +187,43 @@ def create_stock(
 
 
 @router.get("/retrieve/{stock_id}", response_model=StandardResponse)
+@response_cache.cached("stocks:retrieve", tags=("stock:{stock_id}",))
 def retrieve_stock(
     stock_id: int,
+    request: Request,
+    history_limit: int = Query(
+        STOCK_HISTORY_DEFAULT_LIMIT, ge=1, le=STOCK_HISTORY_MAX_LIMIT
+    ),
+    history_since: Optional[datetime] = None,
+    history_cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permissions(["can_view_stock"])),
+    current_user: Principal = Depends(check_permissions(["can_view_stock"])),
 ):
-    """Retrieve a stock by ID"""
+    """Retrieve a stock by ID with a slice of its price history, newest first"""
+    # stock row version + newest history row: 304 without loading either
+    validator = get_validator(
+        db,
+        row_state(Stock, stock_id).add_columns(
+            select(func.max(StockHistory.id))
+            .where(StockHistory.stock_id == stock_id)
+            .scalar_subquery()
+        ),
+        request,
+    )
+    if validator is not None and validator.matches(request):
+        return validator.not_modified()
+    # db_stock = (
+    #     db.query(Stock)
+    #     .options(joinedload(Stock.history))
+    #     .filter(Stock.id == stock_id)
+    #     .first()
+    # )
+    # joinedload repeated the stock columns once per history row and loaded
+    # every row; the history is now a separate, limited keyset query
     db_stock = (
-        db.query(Stock)
-        .options(joinedload(Stock.history))
-        .filter(Stock.id == stock_id)
-        .first()
+        db.query(Stock).filter(Stock.id == stock_id).first()
+        if validator is not None
+        else None
     )
 
     if not db_stock:
@@ -164,14 +234,101 @@ def retrieve_stock(
             ).model_dump(),
         )
 
-    return JSONResponse(
+    rows, next_cursor = history_page(
+        db.execute(
+            history_slice_query(stock_id, history_limit, history_since, history_cursor)
+        ).all(),
+        history_limit,
+    )
+
+    data = StockHistoryRetrieveSchema(
+        **StockRetrieveSchema.model_validate(db_stock).model_dump(),
+        history=[StockHistoryListSchema.model_validate(row) for row in rows],
+        history_next_cursor=next_cursor,
+    )
+
+    return validator.apply(
+        JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=StandardResponse.success_response(
+                data=data.model_dump(mode="json"),
+                message="Stock retrieved successfully.",
+            ).model_dump(),
+        )
+    )
+
+
+@router.get("/history/export")
+def export_stock_history(
+    stock_id: Optional[int] = None,
+    params: ExportParams = Depends(get_export_params),
+    current_user: Principal = Depends(check_permissions(["can_view_stock"])),
+):
+    """Stream price history (one stock or all) as CSV or NDJSON, oldest first"""
+    query = select(*get_schema_columns(StockHistory, StockHistoryListSchema)).order_by(
+        StockHistory.created_at, StockHistory.id
+    )
+    if stock_id is not None:
+        query = query.where(StockHistory.stock_id == stock_id)
+    query = filter_created(query, StockHistory.created_at, params)
+    return export_response(query, params.format, "stock_history")
+
+
+@router.get("/{stock_id}/candles", response_model=StandardResponse)
+def stock_candles(
+    stock_id: int,
+    interval: CandleInterval = CandleInterval.HOUR,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(check_permissions(["can_view_stock"])),
+):
+    """OHLC candles of a stock's price history, aggregated in the database"""
+    # naive bounds are UTC, like the stored timestamps
+    if end is not None and end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start is not None and start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    end = end or datetime.now(timezone.utc)
+    start = start or end - DEFAULT_RANGES[interval]
+    if start >= end:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=StandardResponse.error_response(
+                message="'from' must be before 'to'."
+            ).model_dump(),
+        )
+    if (end - start) / INTERVAL_LENGTHS[interval] > CANDLES_MAX_BUCKETS:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=StandardResponse.error_response(
+                message=f"Range too large: at most {CANDLES_MAX_BUCKETS} {interval.value} candles."
+            ).model_dump(),
+        )
+
+    if db.scalar(select(Stock.id).where(Stock.id == stock_id)) is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content=StandardResponse.error_response(
+                message="Stock not found."
+            ).model_dump(),
+        )
+
+    rows = db.execute(
+        candles_query(stock_id, interval, start, end, db.get_bind().dialect.name)
+    ).mappings()
+
+    return StandardJSONResponse(
         status_code=status.HTTP_200_OK,
         content=StandardResponse.success_response(
-            data=StockHistoryRetrieveSchema.model_validate(db_stock).model_dump(
-                mode="json"
-            ),
-            message="Stock retrieved successfully.",
-        ).model_dump(),
+            data=[CandleSchema.model_validate(row) for row in rows],
+            message="Candles fetched successfully.",
+            meta={
+                "interval": interval.value,
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+            },
+        ),
     )
 
 
@@ -200,6 +357,7 @@ def update_stock(
             db_stock.price = stock.price
 
         if stock.symbol is not None:
+            symbol_cache.invalidate(db_stock.symbol)
             db_stock.symbol = stock.symbol
         if stock.company_name is not None:
             db_stock.company_name = stock.company_name
@@ -207,6 +365,7 @@ def update_stock(
             db_stock.last_updated = stock.last_updated
 
         db.commit()
+        response_cache.invalidate("stocks:list", f"stock:{stock_id}")
         db.refresh(db_stock)
         return JSONResponse(
             status_code=status.HTTP_200_OK,
@@ -229,3 +388,65 @@ def update_stock(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to update stock: {str(e)}",
         )
+
+
+async def _ndjson_ticks(request: Request):
+    """Parse an NDJSON body line by line as it arrives"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield StockPriceTickSchema.model_validate_json(line)
+    if buffer.strip():
+        yield StockPriceTickSchema.model_validate_json(buffer)
+
+
+@router.post("/prices/bulk", response_model=StandardResponse)
+async def bulk_update_prices(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(check_permissions(["can_edit_stock"])),
+):
+    """
+    Price ticks for many stocks at once: a JSON array, or NDJSON
+    (Content-Type: application/x-ndjson) of {"symbol", "price", "ts"}.
+    Applied in batches of STOCK_INGEST_BATCH_SIZE, one commit per batch.
+    """
+    result = IngestResult()
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            batch = []
+            async for tick in _ndjson_ticks(request):
+                batch.append(tick)
+                if len(batch) >= INGEST_BATCH_SIZE:
+                    result.merge(await run_in_threadpool(ingest_prices, db, batch))
+                    batch = []
+            result.merge(await run_in_threadpool(ingest_prices, db, batch))
+        else:
+            ticks = get_list_adapter(StockPriceTickSchema).validate_json(
+                await request.body()
+            )
+            for start in range(0, len(ticks), INGEST_BATCH_SIZE):
+                batch = ticks[start : start + INGEST_BATCH_SIZE]
+                result.merge(await run_in_threadpool(ingest_prices, db, batch))
+    except ValidationError as e:
+        # batches before the bad tick are already committed
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=StandardResponse.error_response(
+                message=f"Invalid price tick after {result.received} received.",
+                error=str(e.errors(include_url=False)[0]["msg"]),
+                meta=asdict(result),
+            ).model_dump(),
+        )
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=StandardResponse.success_response(
+            data=asdict(result),
+            message="Prices updated successfully.",
+        ).model_dump(),
+    )
@@ -1,15 +1,19 @@
+from .candle import CandleSchema
 from .history import StockHistoryListSchema
 from .stock import (
     StockCreateSchema,
     StockHistoryRetrieveSchema,
     StockListSchema,
+    StockPriceTickSchema,
     StockRetrieveSchema,
     StockUpdateSchema,
 )
 
 __all__ = [
+    "CandleSchema",
     "StockCreateSchema",
     "StockListSchema",
+    "StockPriceTickSchema",
     "StockRetrieveSchema",
     "StockUpdateSchema",
     "StockHistoryListSchema",
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class CandleSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    bucket: datetime  # start of the interval
+    open: int
+    high: int
+    low: int
+    close: int
+    count: int
@@ -52,4 +52,11 @@ class StockHistoryRetrieveSchema(BaseModel):
     company_name: str
     price: int
     last_updated: str
-    history: List[StockHistoryListSchema] = []
+    history: List[StockHistoryListSchema] = []  # newest first, one slice
+    history_next_cursor: Optional[str] = None
+
+
+class StockPriceTickSchema(BaseModel):
+    symbol: str
+    price: int
+    ts: Optional[datetime] = None  # tick time, defaults to the time of ingest
@@ -0,0 +1,294 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from decouple import config
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from .conditional import http_date, is_not_modified
+
+# keyword the wrapper adds to the endpoint signature to receive the request
+_REQUEST_PARAM = "_cache_request"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    status_code: int
+    media_type: Optional[str]
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+
+class CacheBackend(ABC):
+    """
+    Storage for cached responses. The memory backend is per process: an
+    invalidation only reaches the worker that handled the write, the others
+    serve their copy until the TTL ends. Use a shared backend (Redis...)
+    via `response_cache.set_backend` when that staleness is not acceptable.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]: ...
+
+    @abstractmethod
+    def set(
+        self, key: str, value: CachedResponse, ttl: float, tags: Iterable[str]
+    ) -> None: ...
+
+    @abstractmethod
+    def invalidate_tags(self, tags: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """TTL + LRU bounded map of key -> response, with a tag -> keys index"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # key -> (expires_at, response, tags)
+        self._data: "OrderedDict[str, Tuple[float, CachedResponse, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(
+        self, key: str, value: CachedResponse, ttl: float, tags: Iterable[str]
+    ) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def _remove(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+def make_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _permission_scope(kwargs: Dict[str, Any]) -> str:
+    """Permission digest of the caller, when the endpoint receives one"""
+    user = kwargs.get("current_user")
+    if user is None:
+        return ""
+    digest = getattr(user, "permissions_digest", None)
+    if digest is None:
+        permissions = getattr(user, "permissions", None) or ()
+        digest = hashlib.sha256(",".join(sorted(permissions)).encode()).hexdigest()[:16]
+    return digest
+
+
+class ResponseCache:
+    """
+    Caches the rendered bytes of read endpoints, keyed by namespace, path
+    params, query string and the caller's permission scope, and answers
+    If-None-Match with 304. Writers drop entries by tag, e.g. "stock:{id}".
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        default_ttl: float = 30.0,
+        max_entry_bytes: int = 1 << 20,
+        enabled: bool = True,
+    ):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.max_entry_bytes = max_entry_bytes
+        self.enabled = enabled
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0}
+        # bumped by every invalidation; a response computed across one is not
+        # stored, it may predate the write
+        self._generation = 0
+
+    def set_backend(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+    def invalidate(self, *tags: str) -> None:
+        self._generation += 1
+        self.backend.invalidate_tags(tags)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    def key(self, namespace: str, request: Request, kwargs: Dict[str, Any]) -> str:
+        path_params = ",".join(
+            f"{k}={v}" for k, v in sorted(request.path_params.items())
+        )
+        query = "&".join(sorted(str(request.query_params).split("&")))
+        return f"{namespace}|{path_params}|{query}|{_permission_scope(kwargs)}"
+
+    def cached(
+        self,
+        namespace: str,
+        tags: Sequence[str] = (),
+        ttl: Optional[float] = None,
+    ) -> Callable:
+        """
+        Decorate a route endpoint (function or bound method). `tags` are
+        formatted with the path params: ("stocks:list", "stock:{stock_id}").
+        Only 200 responses are stored; dependencies (auth, permission checks)
+        still run on every request.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            signature = inspect.signature(func)
+            # FastAPI injects the request into one parameter only: reuse the
+            # endpoint's own if it has one
+            request_param = next(
+                (
+                    name
+                    for name, param in signature.parameters.items()
+                    if param.annotation is Request
+                ),
+                None,
+            )
+            wrapped_signature = signature
+            if request_param is None:
+                wrapped_signature = signature.replace(
+                    parameters=[
+                        *signature.parameters.values(),
+                        inspect.Parameter(
+                            _REQUEST_PARAM,
+                            inspect.Parameter.KEYWORD_ONLY,
+                            annotation=Request,
+                        ),
+                    ]
+                )
+            is_async = asyncio.iscoroutinefunction(func)
+
+            async def call(args, kwargs):
+                if is_async:
+                    return await func(*args, **kwargs)
+                return await run_in_threadpool(func, *args, **kwargs)
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if request_param is None:
+                    request: Request = kwargs.pop(_REQUEST_PARAM)
+                else:
+                    request = kwargs[request_param]
+                if not self.enabled:
+                    return await call(args, kwargs)
+
+                key = self.key(namespace, request, kwargs)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    if is_not_modified(request, entry.etag, entry.last_modified):
+                        self._stats["not_modified"] += 1
+                        return Response(status_code=304, headers=entry.headers())
+                    self._stats["hits"] += 1
+                    return Response(
+                        content=entry.body,
+                        status_code=entry.status_code,
+                        media_type=entry.media_type,
+                        headers={**entry.headers(), "X-Cache": "HIT"},
+                    )
+
+                self._stats["misses"] += 1
+                generation = self._generation
+                response = await call(args, kwargs)
+                if not isinstance(response, Response):
+                    response = JSONResponse(content=jsonable_encoder(response))
+                if response.status_code != 200 or not hasattr(response, "body"):
+                    return response  # errors and streaming responses aren't cached
+
+                body = bytes(response.body)
+                # keep the endpoint's own validators (base.conditional)
+                etag = response.headers.get("etag") or make_etag(body)
+                last_modified = response.headers.get("last-modified")
+                if last_modified is not None:
+                    last_modified = parsedate_to_datetime(last_modified)
+                entry = CachedResponse(
+                    body=body,
+                    status_code=response.status_code,
+                    media_type=response.media_type,
+                    etag=etag,
+                    last_modified=last_modified,
+                )
+                if len(body) <= self.max_entry_bytes and generation == self._generation:
+                    self.backend.set(
+                        key,
+                        entry,
+                        self.default_ttl if ttl is None else ttl,
+                        [tag.format(**request.path_params) for tag in tags],
+                    )
+                if is_not_modified(request, etag, last_modified):
+                    return Response(status_code=304, headers=entry.headers())
+                response.headers["ETag"] = etag
+                response.headers["X-Cache"] = "MISS"
+                return response
+
+            wrapper.__signature__ = wrapped_signature
+            return wrapper
+
+        return decorator
+
+
+response_cache = ResponseCache(
+    backend=MemoryCacheBackend(
+        maxsize=config("RESPONSE_CACHE_MAXSIZE", default=1024, cast=int)
+    ),
+    default_ttl=config("RESPONSE_CACHE_TTL", default=30.0, cast=float),
+    max_entry_bytes=config("RESPONSE_CACHE_MAX_ENTRY_BYTES", default=1 << 20, cast=int),
+    enabled=config("RESPONSE_CACHE_ENABLED", default=True, cast=bool),
+)
@@ -0,0 +1,144 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session
+
+
+def _opaque_tag(etag: str) -> str:
+    # weak comparison: W/"x" matches "x"
+    return etag.strip().removeprefix("W/")
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in header.split(",")}
+
+
+def modified_since(request: Request, last_modified: Optional[datetime]) -> bool:
+    """False when If-Modified-Since is at or after `last_modified`"""
+    header = request.headers.get("if-modified-since")
+    if not header or last_modified is None:
+        return True
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have second precision
+    return last_modified.replace(microsecond=0) > since
+
+
+def is_conditional(request: Request) -> bool:
+    return bool(
+        request.headers.get("if-none-match") or request.headers.get("if-modified-since")
+    )
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    # If-None-Match wins; If-Modified-Since only counts without it (RFC 9110)
+    if request.headers.get("if-none-match"):
+        return etag_matches(request, etag)
+    return not modified_since(request, last_modified)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+@dataclass(frozen=True)
+class Validator:
+    """ETag (weak) + Last-Modified for the current state of some rows"""
+
+    etag: str
+    last_modified: Optional[datetime]
+
+    def matches(self, request: Request) -> bool:
+        return is_not_modified(request, self.etag, self.last_modified)
+
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+    def apply(self, response: Response) -> Response:
+        response.headers.update(self.headers())
+        return response
+
+
+def _last_modified(model):
+    return func.coalesce(model.updated_at, model.created_at)
+
+
+def row_state(model, id: int) -> Select:
+    """(last modified, id) of one row; no row when it doesn't exist"""
+    return select(_last_modified(model), model.id).where(model.id == id)
+
+
+def collection_state(model, *where) -> Select:
+    """
+    (last modified, count, max id) over a table: an insert, update or delete
+    moves at least one of them. One aggregate row comes back, no rows are
+    loaded or serialized.
+    """
+    return select(
+        func.max(_last_modified(model)), func.count(), func.max(model.id)
+    ).where(*where)
+
+
+def get_validator(db: Session, state: Select, request: Request) -> Optional[Validator]:
+    """
+    Validator of the response to `request` from one aggregate row: its first
+    column is the last modification time, the rest is version material.
+    None when the state query returns no row (the resource doesn't exist).
+    """
+    row = db.execute(state).first()
+    if row is None:
+        return None
+    last_modified, *version = row
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return _validator(
+        request,
+        last_modified,
+        [last_modified.isoformat() if last_modified else "", *map(str, version)],
+    )
+
+
+def content_validator(request: Request, content) -> Validator:
+    """
+    Validator from what is about to be rendered, for requests that don't
+    carry a validator: no query, but no Last-Modified either.
+    """
+    material = json.dumps(jsonable_encoder(content), sort_keys=True, default=str)
+    return _validator(request, None, [material])
+
+
+def _validator(request: Request, last_modified, version) -> Validator:
+    # the same rows render differently per path/query (page, filters...)
+    material = "|".join(
+        [
+            request.url.path,
+            "&".join(sorted(str(request.query_params).split("&"))),
+            *version,
+        ]
+    )
+    digest = hashlib.blake2b(material.encode(), digest_size=12).hexdigest()
+    return Validator(etag=f'W/"{digest}"', last_modified=last_modified)
@@ -0,0 +1,200 @@
+import enum
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from decouple import config
+from sqlalchemy import Select, Table, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.util import find_tables
+
+logger = logging.getLogger(__name__)
+
+
+class CountStrategy(str, enum.Enum):
+    EXACT = "exact"  # SELECT count(*) on every request
+    CACHED = "cached"  # exact count, reused for COUNT_CACHE_TTL seconds
+    ESTIMATED = "estimated"  # planner estimate (Postgres), exact elsewhere
+
+
+class CountCache:
+    """
+    TTL + LRU bounded map of normalized count query -> total, with a
+    table -> keys index so writers can drop the counts over a table.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # key -> (expires_at, total, tables)
+        self._data: "OrderedDict[str, Tuple[float, int, Tuple[str, ...]]]" = (
+            OrderedDict()
+        )
+        self._tables: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, total, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return total
+
+    def set(self, key: str, total: int, tables: Iterable[str] = ()) -> None:
+        tables = tuple(tables)
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, total, tables)
+            for table in tables:
+                self._tables.setdefault(table, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def invalidate_tables(self, *tables: str) -> None:
+        """Drop every count that reads one of `tables` (call after a write)"""
+        with self._lock:
+            for table in tables:
+                for key in list(self._tables.get(table, ())):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tables.clear()
+
+    def _remove(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[2]:
+            keys = self._tables.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tables[table]
+
+
+count_cache = CountCache(
+    ttl=config("COUNT_CACHE_TTL", default=30.0, cast=float),
+    maxsize=config("COUNT_CACHE_SIZE", default=1024, cast=int),
+)
+
+
+def _cache_key(query) -> str:
+    """ORDER BY doesn't change a count; SQL + bound params identify it."""
+    return _statement_key(query.order_by(None).statement)
+
+
+def _statement_key(statement: Select) -> str:
+    compiled = statement.compile()
+    params = sorted((k, repr(v)) for k, v in compiled.params.items())
+    return f"{compiled}|{params}"
+
+
+def _table_names(statement: Select) -> Set[str]:
+    return {table.name for table in find_tables(statement)}
+
+
+def _estimate(query) -> Optional[int]:
+    """Planner row estimate on Postgres, None when not available."""
+    return _estimate_statement(query.session, query.order_by(None).statement)
+
+
+def _estimate_statement(db, statement: Select) -> Optional[int]:
+    if db.bind.dialect.name != "postgresql":
+        return None
+    # in a savepoint: a failed lookup must not abort the request's
+    # transaction, the exact count fallback still runs in it
+    with db.begin_nested():
+        return _planner_estimate(db, statement)
+
+
+def _planner_estimate(db, statement) -> Optional[int]:
+    froms = statement.get_final_froms()
+    if (
+        statement.whereclause is None
+        and len(froms) == 1
+        and isinstance(froms[0], Table)
+    ):
+        # Unfiltered table scan: pg_class.reltuples (kept fresh by autovacuum)
+        estimate = db.execute(
+            text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:t AS regclass)"
+            ),
+            {"t": froms[0].fullname},
+        ).scalar()
+        # -1 means the table was never vacuumed/analyzed
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    compiled = statement.compile(dialect=db.bind.dialect)
+    plan = (
+        db.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params)
+        .scalar()
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_query(query, strategy: CountStrategy) -> Tuple[int, CountStrategy]:
+    """Return (total, strategy that actually produced it)"""
+    strategy = CountStrategy(strategy)
+
+    if strategy == CountStrategy.ESTIMATED:
+        try:
+            estimate = _estimate(query)
+        except Exception:
+            logger.exception("Row estimate failed, falling back to exact count")
+            estimate = None
+        if estimate is not None:
+            return estimate, CountStrategy.ESTIMATED
+        strategy = CountStrategy.EXACT
+
+    if strategy == CountStrategy.CACHED:
+        key = _cache_key(query)
+        total = count_cache.get(key)
+        if total is None:
+            total = query.order_by(None).count()
+            count_cache.set(key, total, _table_names(query.statement))
+        return total, CountStrategy.CACHED
+
+    return query.count(), CountStrategy.EXACT
+
+
+async def count_statement_async(
+    db: AsyncSession, statement: Select, strategy: CountStrategy
+) -> Tuple[int, CountStrategy]:
+    """`count_query` for a 2.0-style select() on an AsyncSession"""
+    strategy = CountStrategy(strategy)
+    statement = statement.order_by(None)
+    count = select(func.count()).select_from(statement.subquery())
+
+    if strategy == CountStrategy.ESTIMATED:
+        try:
+            # the planner lookup is sync code: run it on the session's greenlet
+            estimate = await db.run_sync(_estimate_statement, statement)
+        except Exception:
+            logger.exception("Row estimate failed, falling back to exact count")
+            estimate = None
+        if estimate is not None:
+            return estimate, CountStrategy.ESTIMATED
+        strategy = CountStrategy.EXACT
+
+    if strategy == CountStrategy.CACHED:
+        key = _statement_key(statement)
+        total = count_cache.get(key)
+        if total is None:
+            total = await db.scalar(count)
+            count_cache.set(key, total, _table_names(statement))
+        return total, CountStrategy.CACHED
+
+    return await db.scalar(count), CountStrategy.EXACT
@@ -0,0 +1,133 @@
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator, Optional
+
+from decouple import config
+from fastapi.params import Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+
+from apps.database import SessionLocal
+
+EXPORT_YIELD_PER = config("EXPORT_YIELD_PER", default=2000, cast=int)
+
+
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+class ExportParams(BaseModel):
+    format: ExportFormat
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    status_code: Optional[str] = None
+    method: Optional[str] = None
+
+
+def get_export_params(
+    format: ExportFormat = Query(ExportFormat.CSV),
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    status_code: Optional[str] = Query(None),
+    method: Optional[str] = Query(None),
+) -> ExportParams:
+    return ExportParams(
+        format=format,
+        created_from=created_from,
+        created_to=created_to,
+        status_code=status_code,
+        method=method,
+    )
+
+
+def filter_created(query: Select, column, params: ExportParams) -> Select:
+    """Half-open [from, to) range on `column`"""
+    if params.created_from is not None:
+        query = query.where(column >= params.created_from)
+    if params.created_to is not None:
+        query = query.where(column < params.created_to)
+    return query
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), default=_json_default)
+    return value
+
+
+def iter_export(
+    query: Select, fmt: ExportFormat, yield_per: int = EXPORT_YIELD_PER
+) -> Iterator[str]:
+    """
+    Encoded chunks, one per `yield_per` rows, read through a server-side
+    cursor on a session of its own (the request's session is closed once the
+    response starts). Memory stays flat however many rows match.
+    """
+    with SessionLocal() as db:
+        result = db.execute(
+            query, execution_options={"stream_results": True, "yield_per": yield_per}
+        )
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        if fmt is ExportFormat.CSV:
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+        for partition in result.partitions():
+            if fmt is ExportFormat.CSV:
+                writer.writerows([_csv_value(v) for v in row] for row in partition)
+            else:
+                for row in partition:
+                    buffer.write(
+                        json.dumps(
+                            dict(zip(columns, row)),
+                            separators=(",", ":"),
+                            default=_json_default,
+                        )
+                    )
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()  # CSV header of an empty export
+
+
+def export_response(
+    query: Select, fmt: ExportFormat, filename: str
+) -> StreamingResponse:
+    """Stream `query` (a Core select of plain columns) as a CSV/NDJSON download"""
+    return StreamingResponse(
+        iter_export(query, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{fmt.value}"'
+        },
+    )
@@ -0,0 +1,92 @@
+"""
+Pre-built OpenAPI document.
+
+FastAPI generates /openapi.json on the first request of every worker, which
+walks every route and pydantic model. Build it once instead:
+
+    python -m base.openapi openapi.json
+
+and point OPENAPI_SCHEMA_PATH at the file. Workers then serve its bytes
+as-is. A document built from different code is ignored (with a warning)
+and the schema is generated as usual.
+"""
+
+import hashlib
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Optional
+
+from decouple import config
+from fastapi import FastAPI
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+OPENAPI_SCHEMA_PATH = config("OPENAPI_SCHEMA_PATH", default="")
+FINGERPRINT_KEY = "x-source-fingerprint"
+
+
+def source_fingerprint() -> str:
+    """
+    Digest of the loaded application modules (main, apps.*, base.*): a
+    document built from other code is stale. Hashes a few hundred KB.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(sys.modules):
+        if name != "main" and not name.startswith(("apps.", "base.")):
+            continue
+        filename = getattr(sys.modules[name], "__file__", None)
+        if filename:
+            digest.update(name.encode())
+            digest.update(Path(filename).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def build_openapi(app: FastAPI, path: str) -> None:
+    schema = dict(app.openapi())
+    schema[FINGERPRINT_KEY] = source_fingerprint()
+    Path(path).write_text(json.dumps(schema, separators=(",", ":")))
+
+
+def load_openapi(app: FastAPI, path: str) -> Optional[bytes]:
+    try:
+        body = Path(path).read_bytes()
+        schema = json.loads(body)
+    except (OSError, ValueError):
+        logger.warning("OpenAPI document %s is unreadable, generating it", path)
+        return None
+    if schema.get(FINGERPRINT_KEY) != source_fingerprint():
+        logger.warning("OpenAPI document %s is out of date, generating it", path)
+        return None
+    app.openapi_schema = schema  # app.openapi() callers get it too
+    return body
+
+
+def install_openapi(app: FastAPI, path: str = OPENAPI_SCHEMA_PATH) -> None:
+    """Serve the pre-built document at app.openapi_url, if there is a valid one"""
+    if not path or not app.openapi_url:
+        return
+    body = load_openapi(app, path)
+    if body is None:
+        return
+
+    async def openapi(request: Request) -> Response:
+        return Response(body, media_type="application/json")
+
+    app.router.routes = [
+        route
+        for route in app.router.routes
+        if getattr(route, "path", None) != app.openapi_url
+    ]
+    app.add_route(app.openapi_url, openapi, include_in_schema=False)
+
+
+if __name__ == "__main__":
+    from main import app
+
+    output = sys.argv[1] if len(sys.argv) > 1 else "openapi.json"
+    build_openapi(app, output)
+    print(f"Wrote {output} ({source_fingerprint()})")
@@ -1,12 +1,22 @@
+import base64
+import json
 import logging
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
 from math import ceil
-from typing import Dict, Generic, List, Optional, Type, TypeVar
+from typing import Any, Dict, Generic, List, Optional, Sequence, Type, TypeVar
 
 from fastapi import HTTPException
 from fastapi.params import Query
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Select, func, inspect, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+
+from apps.metrics.timing import timed
+
+from .count import CountStrategy, count_query, count_statement_async
 
 # logging.basicConfig(
 # level=logging.INFO,  # Show INFO and above
@@ -21,13 +31,39 @@ SchemaType = TypeVar("SchemaType")
 class PaginationParams(BaseModel):
     page: int
     page_size: int
+    cursor: bool = False
+    after: Optional[str] = None
 
 
 def get_pagination_params(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: bool = Query(
+        False, description="Use cursor pagination (endpoints that support it)"
+    ),
+    after: Optional[str] = Query(
+        None, description="`next_cursor` of the previous page (implies cursor=true)"
+    ),
 ) -> PaginationParams:
-    return PaginationParams(page=page, page_size=page_size)
+    return PaginationParams(
+        page=page, page_size=page_size, cursor=cursor or after is not None, after=after
+    )
+
+
+def get_cursor_pagination_params(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: bool = Query(
+        True, description="cursor=false: page numbers and a total count instead"
+    ),
+    after: Optional[str] = Query(
+        None, description="`next_cursor` of the previous page"
+    ),
+) -> PaginationParams:
+    """`get_pagination_params` for lists that default to cursor pagination"""
+    return PaginationParams(
+        page=page, page_size=page_size, cursor=cursor or after is not None, after=after
+    )
 
 
 class PaginationMeta(BaseModel):
@@ -38,6 +74,14 @@ class PaginationMeta(BaseModel):
     previous_page: Optional[int]
     next_page: Optional[int]
     timestamp: str
+    count_strategy: CountStrategy = CountStrategy.EXACT
+
+
+class CursorPaginationMeta(BaseModel):
+    page_size: int
+    next_cursor: Optional[str]
+    has_more: bool
+    timestamp: str
 
 
 class CustomPagination(BaseModel, Generic[SchemaType]):
@@ -45,6 +89,169 @@ class CustomPagination(BaseModel, Generic[SchemaType]):
     meta: Dict
 
 
+# cursor values JSON can't carry as-is: {tag: str(value)}
+_CURSOR_TYPES = {"dt": datetime, "d": date, "dec": Decimal}
+
+
+def _encode_cursor_value(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # datetime before date, it is a subclass
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    raise TypeError(f"Can't use a {type(value).__name__} column as a cursor key")
+
+
+def _decode_cursor_value(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    ((tag, text),) = value.items()
+    if tag == "dec":
+        return Decimal(text)
+    return _CURSOR_TYPES[tag].fromisoformat(text)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor for the sort key of the last row of a page"""
+    payload = [_encode_cursor_value(value) for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = [_decode_cursor_value(value) for value in payload]
+    except (ValueError, TypeError, KeyError, InvalidOperation):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+@lru_cache(maxsize=None)
+def get_list_adapter(schema: Type[SchemaType]) -> TypeAdapter:
+    """One TypeAdapter(list[schema]) per schema, built once"""
+    return TypeAdapter(List[schema])
+
+
+@lru_cache(maxsize=None)
+def get_schema_columns(model, schema: Type[SchemaType]) -> Optional[tuple]:
+    """
+    Model columns backing every field of `schema`, or None when a field is not
+    a plain column (relationship, property...) and full ORM objects are needed.
+    """
+    column_attrs = inspect(model).column_attrs
+    if not all(name in column_attrs for name in schema.model_fields):
+        return None
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+
+@lru_cache(maxsize=None)
+def get_schema_load_columns(model, schema: Type[SchemaType]) -> tuple:
+    """Column attributes of `model` that `schema` reads (relationships excluded)"""
+    mapper = inspect(model, raiseerr=False)
+    if mapper is None:
+        return ()
+    column_attrs = mapper.column_attrs
+    return tuple(
+        getattr(model, name) for name in schema.model_fields if name in column_attrs
+    )
+
+
+def defer_unused_columns(query, schema: Type[SchemaType], keyset: Sequence = ()):
+    """
+    ORM path: load_only() the columns the schema (and keyset) read, so large
+    columns the list schema drops (JSON bodies, password hashes...) are never
+    fetched. Works for both Query and select().
+    """
+    model = query.column_descriptions[0]["entity"]
+    if not isinstance(model, type):
+        return query  # subquery/Core rows: already just the selected columns
+    columns = get_schema_load_columns(model, schema)
+    if not columns:
+        return query
+    extra = [column for column in keyset if column.key not in schema.model_fields]
+    return query.options(load_only(*columns, *extra))
+
+
+def project_query(query, schema: Type[SchemaType], keyset: Sequence = ()):
+    """Select only the schema's columns (plus the keyset) as Core rows"""
+    model = query.column_descriptions[0]["entity"]
+    if not isinstance(model, type):
+        return query, True  # already rows (query over a subquery)
+    columns = get_schema_columns(model, schema)
+    if columns is None:
+        return query, False
+    extra = [column for column in keyset if column.key not in schema.model_fields]
+    return query.with_entities(*columns, *extra), True
+
+
+def serialize_items(items, schema: Type[SchemaType], as_rows: bool) -> list:
+    with timed("serialize"):
+        if as_rows:
+            # single validation pass; models are dumped later by StandardJSONResponse
+            return get_list_adapter(schema).validate_python(items, from_attributes=True)
+        return [schema.model_validate(item).model_dump() for item in items]
+
+
+def keyset_paginate(
+    *,
+    query,
+    pagination: PaginationParams,
+    schema: Type[SchemaType],
+    keyset: Sequence,
+    descending: bool = False,
+    as_rows: bool = False,
+) -> CustomPagination[SchemaType]:
+    """
+    Cursor pagination: `WHERE (k1, k2) > (:v1, :v2) ORDER BY k1, k2 LIMIT n+1`.
+    No count and no OFFSET scan, so deep pages cost the same as the first one.
+    `keyset` must end with a unique column (usually the id).
+    """
+    page_size = pagination.page_size
+
+    if as_rows:
+        query, as_rows = project_query(query, schema, keyset)
+    if not as_rows:
+        query = defer_unused_columns(query, schema, keyset)
+
+    query = query.order_by(None).order_by(
+        *(column.desc() if descending else column.asc() for column in keyset)
+    )
+    if pagination.after:
+        values = decode_cursor(pagination.after, len(keyset))
+        key = tuple_(*keyset)
+        query = query.filter(
+            key < tuple_(*values) if descending else key > tuple_(*values)
+        )
+
+    items = query.limit(page_size + 1).all()
+    has_more = len(items) > page_size
+    items = items[:page_size]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(
+            [getattr(items[-1], column.key) for column in keyset]
+        )
+
+    serialized_data = serialize_items(items, schema, as_rows)
+
+    meta = CursorPaginationMeta(
+        page_size=page_size,
+        next_cursor=next_cursor,
+        has_more=has_more,
+        timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    return CustomPagination(data=serialized_data, meta=meta.model_dump(mode="json"))
+
+
 def paginate(
     *,
     query,
@@ -52,8 +259,29 @@ def paginate(
     # page_size: int = 10,
     pagination: PaginationParams,
     schema: Type[SchemaType],
+    keyset: Optional[Sequence] = None,  # opt-in: sort key columns for cursor mode
+    descending: bool = False,
+    count_strategy: CountStrategy = CountStrategy.EXACT,
+    # fast path: fetch only the schema columns as rows and return validated
+    # schema instances (render with StandardJSONResponse) instead of dicts
+    as_rows: bool = False,
 ) -> CustomPagination[SchemaType]:
 
+    if keyset and pagination.cursor:
+        return keyset_paginate(
+            query=query,
+            pagination=pagination,
+            schema=schema,
+            keyset=keyset,
+            descending=descending,
+            as_rows=as_rows,
+        )
+
+    if as_rows:
+        query, as_rows = project_query(query, schema)
+    if not as_rows:
+        query = defer_unused_columns(query, schema)
+
     page = pagination.page
     page_size = pagination.page_size
 
@@ -66,16 +294,17 @@ def paginate(
         ]
         # raise ValueError("page_size must be between 1 and 100")
 
-    total = query.count()
+    total, count_strategy = count_query(query, count_strategy)
     total_pages = ceil(total / page_size) if total else 1
 
-    if page > total_pages:
+    # cached/estimated totals can lag behind, so only exact counts can 404
+    if page > total_pages and count_strategy == CountStrategy.EXACT:
         raise HTTPException(status_code=404, detail="Page not found")
         # raise ValueError("Page not found")
 
     items = query.offset((page - 1) * page_size).limit(page_size).all()
 
-    serialized_data = [schema.model_validate(item).model_dump() for item in items]
+    serialized_data = serialize_items(items, schema, as_rows)
 
     # logger.info(f"Query: {query}")
     # has_count = hasattr(query, "count")
@@ -90,5 +319,46 @@ def paginate(
         previous_page=page - 1 if page > 1 else None,
         next_page=page + 1 if page < total_pages else None,
         timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        count_strategy=count_strategy,
+    )
+    return CustomPagination(data=serialized_data, meta=meta.model_dump(mode="json"))
+
+
+async def paginate_async(
+    *,
+    db: AsyncSession,
+    query: Select,
+    pagination: PaginationParams,
+    schema: Type[SchemaType],
+    count_strategy: CountStrategy = CountStrategy.EXACT,
+) -> CustomPagination[SchemaType]:
+    """`paginate` for 2.0-style `select()` statements on an AsyncSession"""
+
+    page = pagination.page
+    page_size = pagination.page_size
+    query = defer_unused_columns(query, schema)
+
+    total, count_strategy = await count_statement_async(db, query, count_strategy)
+    total_pages = ceil(total / page_size) if total else 1
+
+    # cached/estimated totals can lag behind, so only exact counts can 404
+    if page > total_pages and count_strategy == CountStrategy.EXACT:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+    items = (
+        await db.scalars(query.offset((page - 1) * page_size).limit(page_size))
+    ).all()
+
+    serialized_data = serialize_items(items, schema, as_rows=False)
+
+    meta = PaginationMeta(
+        total=total,
+        page=page,
+        page_size=page_size,
+        total_pages=total_pages,
+        previous_page=page - 1 if page > 1 else None,
+        next_page=page + 1 if page < total_pages else None,
+        timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        count_strategy=count_strategy,
     )
-    return CustomPagination(data=serialized_data, meta=meta.model_dump())
+    return CustomPagination(data=serialized_data, meta=meta.model_dump(mode="json"))
@@ -1,12 +1,25 @@
 from datetime import datetime
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar
+from typing import Any, Dict, Generic, List, Optional, Sequence, Type, TypeVar
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, ConfigDict, Field
+from pydantic_core import to_json
 from sqlalchemy.orm import Session
 
 from apps.database import get_db
+from apps.metrics.queries import query_budget
+from apps.metrics.timing import timed
 
+from .cache import response_cache
+from .conditional import (
+    collection_state,
+    content_validator,
+    get_validator,
+    is_conditional,
+    row_state,
+)
+from .count import CountStrategy
 from .pagination import get_pagination_params, paginate
 
 ModelType = TypeVar("ModelType")
@@ -59,6 +72,22 @@ class StandardResponse(BaseModel):
             **({} if meta is None else {"meta": meta}),
         )
 
+    def model_dump(self, **kwargs) -> Dict[str, Any]:
+        with timed("response"):
+            return super().model_dump(**kwargs)
+
+
+class StandardJSONResponse(JSONResponse):
+    """
+    JSONResponse that serializes a StandardResponse (nested schema instances
+    included) straight to bytes with pydantic-core, instead of model_dump()
+    building dicts that json.dumps() walks a second time.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with timed("response"):
+            return to_json(content)
+
 
 class CreateRouter(Generic[ModelType, CreateSchemaType]):
     def __init__(
@@ -94,21 +123,40 @@ class ReadRouter(Generic[ModelType, ReadSchemaType]):
         schema: Type[ReadSchemaType],
         prefix: str = "",
         tags: list[str] | None = None,
+        keyset: Sequence[str] | None = None,  # e.g. ("id",) to allow ?cursor=true
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        cache_tags: Sequence[str] | None = None,  # cache responses, see base.cache
     ):
         if prefix and not prefix.startswith("/"):
             prefix = "/" + prefix
         self.model = model
         self.schema = schema
+        self.keyset = keyset
+        self.count_strategy = count_strategy
         self.router = APIRouter(prefix=prefix, tags=tags)
-        self.router.get("", response_model=StandardResponse)(self.read_all)
+        endpoint = self.read_all
+        if cache_tags is not None:
+            endpoint = response_cache.cached(
+                f"{model.__tablename__}:list", tags=cache_tags
+            )(endpoint)
+        self.router.get("", response_model=StandardResponse)(endpoint)
 
+    @query_budget(3)  # validator (conditional requests only), count, page
     def read_all(
         self,
+        request: Request,
         # page: int = 1,
         # page_size: int = 10,
         db: Session = Depends(get_db),
         pagination=Depends(get_pagination_params),
     ):
+        # the collection state is a full-table aggregate: only worth running
+        # when it can save the count and the page
+        validator = None
+        if is_conditional(request):
+            validator = get_validator(db, collection_state(self.model), request)
+            if validator.matches(request):
+                return validator.not_modified()
         try:
             result = paginate(
                 query=db.query(self.model),
@@ -116,6 +164,13 @@ class ReadRouter(Generic[ModelType, ReadSchemaType]):
                 # page_size=page_size,
                 schema=self.schema,
                 pagination=pagination,
+                keyset=(
+                    [getattr(self.model, name) for name in self.keyset]
+                    if self.keyset
+                    else None
+                ),
+                count_strategy=self.count_strategy,
+                as_rows=True,
             )
         except ValueError as exc:
             raise HTTPException(status_code=400, detail=str(exc))
@@ -126,12 +181,29 @@ class ReadRouter(Generic[ModelType, ReadSchemaType]):
             if hasattr(result.meta, "model_dump")
             else dict(result.meta)
         )
+        # meta minus its timestamp: the same page must keep the same ETag
+        page = content_validator(
+            request,
+            {
+                "data": result.data,
+                "meta": {k: v for k, v in meta_dict.items() if k != "timestamp"},
+            },
+        )
+        if validator is None:
+            validator = page
+        elif page.matches(request):
+            # an ETag from a plain GET: same page, hand over the state one
+            return validator.not_modified()
         meta_dict["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return StandardResponse(
-            success=True,
-            data=result.data,
-            message="Retrieved successfully",
-            meta=meta_dict,
+        return validator.apply(
+            StandardJSONResponse(
+                content=StandardResponse(
+                    success=True,
+                    data=result.data,
+                    message="Retrieved successfully",
+                    meta=meta_dict,
+                )
+            )
         )
 
 
@@ -142,22 +214,38 @@ class RetrieveRouter(Generic[ModelType, ReadSchemaType]):
         schema: Type[ReadSchemaType],
         prefix: str = "",
         tags: list[str] | None = None,
+        cache_tags: Sequence[str] | None = None,  # e.g. ("post:{id}",)
     ):
         if prefix and not prefix.startswith("/"):
             prefix = "" + prefix
         self.model = model
         self.schema = schema
         self.router = APIRouter(prefix=prefix, tags=tags)
-        self.router.get("", response_model=StandardResponse)(self.retrieve)
+        endpoint = self.retrieve
+        if cache_tags is not None:
+            endpoint = response_cache.cached(
+                f"{model.__tablename__}:retrieve", tags=cache_tags
+            )(endpoint)
+        self.router.get("", response_model=StandardResponse)(endpoint)
 
-    def retrieve(self, id: int, db: Session = Depends(get_db)):
+    @query_budget(2)  # validator, row
+    def retrieve(self, id: int, request: Request, db: Session = Depends(get_db)):
+        validator = get_validator(db, row_state(self.model, id), request)
+        if validator is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        if validator.matches(request):
+            return validator.not_modified()
         db_item = db.query(self.model).filter(self.model.id == id).first()
         if not db_item:
             raise HTTPException(status_code=404, detail="Not found")
-        return StandardResponse(
-            success=True,
-            data=self.schema.model_validate(db_item),
-            message="Retrieved successfully",
+        return validator.apply(
+            StandardJSONResponse(
+                content=StandardResponse(
+                    success=True,
+                    data=self.schema.model_validate(db_item),
+                    message="Retrieved successfully",
+                )
+            )
         )
 
 
@@ -0,0 +1,96 @@
+"""
+Stream a large stock history export (what GET /api/v1/stocks/history/export
+runs) and report throughput and peak memory:
+
+    python -m benchmarks.export --rows 1000000
+    python -m benchmarks.export --rows 1000000 --format ndjson --yield-per 5000
+
+Seeds `--rows` stock_history rows for a stock named BENCHEXP on first run
+(kept for later runs). Point DATABASE_URL_ at a scratch database. Peak RSS
+should stay flat as --rows grows; with stream_results off it grows with it.
+"""
+
+import argparse
+import resource
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select
+
+from apps.database import SessionLocal
+from apps.stock.models import Stock, StockHistory
+from apps.stock.schema import StockHistoryListSchema
+from base.export import ExportFormat, iter_export
+from base.pagination import get_schema_columns
+
+SYMBOL = "BENCHEXP"
+
+
+def seed(rows: int) -> int:
+    with SessionLocal() as db:
+        stock_id = db.scalar(select(Stock.id).where(Stock.symbol == SYMBOL))
+        if stock_id is None:
+            stock = Stock(symbol=SYMBOL, company_name="Export benchmark", price=100)
+            db.add(stock)
+            db.flush()
+            stock_id = stock.id
+        existing = db.scalar(
+            select(func.count()).where(StockHistory.stock_id == stock_id)
+        )
+        started = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        for start in range(existing, rows, 50_000):
+            db.execute(
+                insert(StockHistory),
+                [
+                    {
+                        "stock_id": stock_id,
+                        "price": 100 + n % 50,
+                        "created_at": started + timedelta(seconds=n),
+                    }
+                    for n in range(start, min(start + 50_000, rows))
+                ],
+            )
+            db.commit()
+            print(f"seeded {min(start + 50_000, rows)}/{rows}", end="\r")
+    return stock_id
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(args):
+    stock_id = seed(args.rows)
+    query = (
+        select(*get_schema_columns(StockHistory, StockHistoryListSchema))
+        .where(StockHistory.stock_id == stock_id)
+        .order_by(StockHistory.created_at, StockHistory.id)
+        .limit(args.rows)
+    )
+
+    rss_before = peak_rss_mib()
+    started = time.perf_counter()
+    size = 0
+    chunks = 0
+    for chunk in iter_export(query, ExportFormat(args.format), args.yield_per):
+        size += len(chunk.encode())
+        chunks += 1
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{args.format}: {args.rows} rows in {elapsed:.1f}s "
+        f"({args.rows / elapsed:,.0f} rows/s, {size / elapsed / 2**20:.1f} MiB/s), "
+        f"{chunks} chunks, {size / 2**20:.1f} MiB"
+    )
+    print(f"peak RSS: {rss_before:.0f} MiB before, {peak_rss_mib():.0f} MiB after")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--format", choices=[f.value for f in ExportFormat], default="csv"
+    )
+    parser.add_argument("--yield-per", type=int, default=2000)
+    main(parser.parse_args())
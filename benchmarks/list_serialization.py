@@ -0,0 +1,112 @@
+"""
+Legacy vs fast list serialization for /api/v1/stocks/list and
+/api/v1/api-logs/list, measured at the function level (no HTTP):
+
+    legacy: ORM objects -> model_validate().model_dump() per row
+            -> StandardResponse.model_dump() -> json.dumps (JSONResponse)
+    fast:   schema columns as rows -> TypeAdapter(list[schema]) in one pass
+            -> pydantic-core to_json (StandardJSONResponse)
+
+    DATABASE_URL_=sqlite:///./bench.db python -m benchmarks.list_serialization
+"""
+
+import argparse
+import time
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+
+from apps.api_logs.models import APILog
+from apps.api_logs.schemas import APILogList
+from apps.database import Base, SessionLocal, engine
+from apps.stock.models import Stock
+from apps.stock.schema import StockListSchema
+from base.pagination import PaginationParams, paginate
+from base.route import StandardJSONResponse, StandardResponse
+
+HEADERS = {f"x-header-{i}": "v" * 40 for i in range(20)}
+
+
+def seed(rows: int) -> None:
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        missing = rows - db.scalar(select(func.count()).select_from(APILog))
+        db.add_all(
+            APILog(
+                url="http://bench/api/v1/stocks/create",
+                method="POST",
+                header=HEADERS,
+                body={"symbol": "X", "company_name": "Y" * 100, "price": 1},
+                response={"detail": "z" * 2000},
+                status_code="201",
+            )
+            for _ in range(max(missing, 0))
+        )
+        missing = rows - db.scalar(select(func.count()).select_from(Stock))
+        offset = rows - missing
+        db.add_all(
+            Stock(symbol=f"S{offset + i}", company_name=f"Company {i}", price=i)
+            for i in range(max(missing, 0))
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def legacy(db, model, schema, page_size):
+    result = paginate(
+        query=db.query(model).order_by(model.id),
+        pagination=PaginationParams(page=1, page_size=page_size),
+        schema=schema,
+    )
+    return JSONResponse(
+        content=StandardResponse.success_response(
+            data=result.data, meta=result.meta
+        ).model_dump(mode="json")
+    ).body
+
+
+def fast(db, model, schema, page_size):
+    result = paginate(
+        query=db.query(model).order_by(model.id),
+        pagination=PaginationParams(page=1, page_size=page_size),
+        schema=schema,
+        as_rows=True,
+    )
+    return StandardJSONResponse(
+        content=StandardResponse.success_response(data=result.data, meta=result.meta)
+    ).body
+
+
+def timed(fn, iterations, *args):
+    db = SessionLocal()
+    try:
+        fn(db, *args)  # warm up caches / adapters
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn(db, *args)
+            db.expunge_all()
+        return (time.perf_counter() - started) / iterations * 1000
+    finally:
+        db.close()
+
+
+def main(args):
+    seed(args.rows)
+    print(f"{'endpoint':<16}{'legacy ms':>12}{'fast ms':>12}{'speedup':>10}")
+    for name, model, schema in (
+        ("stocks/list", Stock, StockListSchema),
+        ("api-logs/list", APILog, APILogList),
+    ):
+        slow_ms = timed(legacy, args.iterations, model, schema, args.page_size)
+        fast_ms = timed(fast, args.iterations, model, schema, args.page_size)
+        print(f"{name:<16}{slow_ms:>12.2f}{fast_ms:>12.2f}{slow_ms / fast_ms:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,153 @@
+"""
+Hold thousands of idle SSE connections on /api/v1/notifications/stream and
+measure how long one broadcast takes to reach all of them.
+
+Needs a running server (one worker, to measure per-worker capacity):
+
+    NOTIFICATION_STREAM_HEARTBEAT=5 uvicorn main:app --port 8000
+    python -m benchmarks.notification_stream --connections 5000 --hold 30 \\
+        --user-id 1 --publish
+
+Connections are plain asyncio sockets (no client library), all for
+`--user-id` (any active user; the token is minted with SECRET_KEY).
+`--publish` creates a stock, whose "new stock" broadcast is pushed to every
+connection. Raise `ulimit -n` on both sides for large connection counts.
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from apps.authentication.authentication import create_access_token
+
+STREAM_PATH = "/api/v1/notifications/stream"
+
+
+class Stats:
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.closed = 0
+        self.pings = 0
+        self.received = []  # arrival time of the first notification, per connection
+
+
+async def open_stream(host, port, token, stats: Stats, stop: asyncio.Event):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(
+            (
+                f"GET {STREAM_PATH} HTTP/1.1\r\nHost: {host}\r\n"
+                f"Authorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n"
+            ).encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        if b" 200 " not in status_line:
+            stats.failed += 1
+            writer.close()
+            return
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass  # headers
+    except OSError:
+        stats.failed += 1
+        return
+
+    stats.connected += 1
+    seen_event = False
+    try:
+        while not stop.is_set():
+            line = await reader.readline()
+            if not line:
+                stats.closed += 1
+                break
+            if b": ping" in line:
+                stats.pings += 1
+            elif b"event: notification" in line and not seen_event:
+                seen_event = True
+                stats.received.append(time.perf_counter())
+    finally:
+        writer.close()
+
+
+async def publish(host, port, token) -> float:
+    body = json.dumps(
+        {"symbol": f"LT{uuid.uuid4().hex[:6]}", "company_name": "Load test", "price": 1}
+    ).encode()
+    reader, writer = await asyncio.open_connection(host, port)
+    started = time.perf_counter()
+    writer.write(
+        (
+            f"POST /api/v1/stocks/create HTTP/1.1\r\nHost: {host}\r\n"
+            f"Authorization: Bearer {token}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+        ).encode()
+        + body
+    )
+    await writer.drain()
+    await reader.read()
+    writer.close()
+    return started
+
+
+async def main(args):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    token = create_access_token({"sub": str(args.user_id)})
+
+    stats = Stats()
+    stop = asyncio.Event()
+    started = time.perf_counter()
+    tasks = []
+    for i in range(args.connections):
+        tasks.append(asyncio.create_task(open_stream(host, port, token, stats, stop)))
+        if i % 500 == 499:
+            await asyncio.sleep(0.05)  # don't overflow the accept backlog
+    while stats.connected + stats.failed < args.connections:
+        await asyncio.sleep(0.1)
+        if time.perf_counter() - started > 60:
+            break
+    print(
+        f"connected={stats.connected} failed={stats.failed} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+    published_at = None
+    if args.publish:
+        published_at = await publish(host, port, token)
+
+    await asyncio.sleep(args.hold)
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"heartbeats={stats.pings} closed_by_server={stats.closed}")
+    if published_at is not None:
+        latencies = sorted((t - published_at) * 1000 for t in stats.received)
+        if latencies:
+            print(
+                f"broadcast delivered to {len(latencies)}/{stats.connected}: "
+                f"p50={statistics.median(latencies):.1f}ms "
+                f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f}ms "
+                f"max={latencies[-1]:.1f}ms"
+            )
+        else:
+            print("broadcast not delivered")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--hold", type=float, default=20.0)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--publish", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""
+Logins (password verifications) per second at different argon2 costs, run
+through the hashing executor the auth endpoints use:
+
+    python -m benchmarks.password_hashing
+    python -m benchmarks.password_hashing --costs 2:19456:1,3:65536:4 \\
+        --workers 8 --concurrency 32 --logins 400
+
+Each cost is TIME_COST:MEMORY_COST_KIB:PARALLELISM (ARGON2_* settings).
+"loop lag" is the worst delay seen by a 10 ms ticker on the event loop while
+the logins run: near zero with the executor, hundreds of ms with `--inline`.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from functools import lru_cache
+
+from passlib.context import CryptContext
+
+from apps.authentication.hashing import PasswordHasher
+
+PASSWORD = "bench-password"
+
+
+@lru_cache
+def get_context(cost: tuple) -> CryptContext:
+    time_cost, memory_cost, parallelism = cost
+    return CryptContext(
+        schemes=["argon2"],
+        argon2__rounds=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+def verify(cost: tuple, password: str, hashed: str) -> bool:
+    # module level so it can run in a process pool
+    return get_context(cost).verify(password, hashed)
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def bench(cost: tuple, args) -> dict:
+    hashed = get_context(cost).hash(PASSWORD)
+    hasher = PasswordHasher(
+        max_workers=args.workers,
+        max_concurrency=args.concurrency,
+        use_processes=args.processes,
+    )
+    latencies = []
+
+    async def login():
+        started = time.perf_counter()
+        if args.inline:
+            ok = verify(cost, PASSWORD, hashed)
+            await asyncio.sleep(0)
+        else:
+            ok = await hasher.run(verify, cost, PASSWORD, hashed)
+        assert ok
+        latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(args.logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    hasher.shutdown()
+
+    latencies.sort()
+    return {
+        "logins_per_s": args.logins / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "loop_lag_ms": await lag * 1000,
+    }
+
+
+async def main(args):
+    costs = [tuple(int(v) for v in cost.split(":")) for cost in args.costs.split(",")]
+    mode = "inline" if args.inline else ("processes" if args.processes else "threads")
+    print(f"mode={mode} workers={args.workers} concurrency={args.concurrency}")
+    print(
+        f"{'t:m:p':<16}{'logins/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'loop lag ms':>13}"
+    )
+    for cost in costs:
+        result = await bench(cost, args)
+        print(
+            f"{':'.join(map(str, cost)):<16}{result['logins_per_s']:>10.1f}"
+            f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+            f"{result['loop_lag_ms']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--costs", default="2:19456:1,3:65536:4,4:131072:4")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--processes", action="store_true")
+    parser.add_argument("--inline", action="store_true", help="verify on the loop")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,103 @@
+"""
+Worker cold start: `import main` time, the modules that dominate it (from
+`python -X importtime`), and the first /openapi.json request with and
+without a pre-built document (base/openapi.py):
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --top 30
+
+Every measurement runs in a fresh interpreter, like a restarting worker.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+FIRST_REQUEST = """
+import time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+client.get("/__warmup__")  # starts the test client's event loop thread
+sent = time.perf_counter()
+assert client.get("/openapi.json").status_code == 200
+print((imported - started) * 1000, (time.perf_counter() - sent) * 1000)
+"""
+
+
+def run(code: str, env: dict, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_profile(env: dict) -> list:
+    """(module, self us, cumulative us) for one `import main`"""
+    stderr = run("import main", env, "-X", "importtime").stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def first_request(env: dict, runs: int) -> tuple:
+    imports, requests = [], []
+    for _ in range(runs):
+        import_ms, request_ms = map(float, run(FIRST_REQUEST, env).stdout.split())
+        imports.append(import_ms)
+        requests.append(request_ms)
+    return statistics.median(imports), statistics.median(requests)
+
+
+def main(args):
+    env = {**os.environ, "PYTHONPATH": os.getcwd(), "OPENAPI_SCHEMA_PATH": ""}
+    run("import main", env)  # write the .pyc files first
+
+    rows = import_profile(env)
+    total = sum(self_us for _, self_us, _ in rows)
+    by_package = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    print(f"import main: {total / 1000:.0f} ms over {len(rows)} modules")
+    print(f"\n{'package':<32}{'self ms':>10}")
+    for package, self_us in sorted(by_package.items(), key=lambda i: -i[1])[: args.top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}")
+    print(f"\n{'module':<48}{'self ms':>10}{'cumulative ms':>15}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[1])[: args.top]:
+        print(f"{name:<48}{self_us / 1000:>10.1f}{cumulative_us / 1000:>15.1f}")
+
+    import_ms, generated_ms = first_request(env, args.runs)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "openapi.json")
+        subprocess.run(
+            [sys.executable, "-m", "base.openapi", path],
+            env=env,
+            capture_output=True,
+            check=True,
+        )
+        _, prebuilt_ms = first_request({**env, "OPENAPI_SCHEMA_PATH": path}, args.runs)
+
+    print(f"\nmedian of {args.runs} cold starts:")
+    print(f"  import main:                    {import_ms:8.1f} ms")
+    print(f"  first /openapi.json, generated: {generated_ms:8.1f} ms")
+    print(f"  first /openapi.json, pre-built: {prebuilt_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    main(parser.parse_args())
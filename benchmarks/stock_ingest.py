@@ -0,0 +1,94 @@
+"""
+Price ticks per second through the bulk ingest path (ingest_prices, what
+POST /api/v1/stocks/prices/bulk runs) against one-tick-at-a-time updates
+(what PATCH /api/v1/stocks/update/{id} does), on the configured database:
+
+    python -m benchmarks.stock_ingest
+    python -m benchmarks.stock_ingest --stocks 2000 --ticks 100000 --batch 5000
+
+Creates `--stocks` stocks named BI<n> on first run (kept for later runs).
+Point DATABASE_URL_ at a scratch database.
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import select
+
+from apps.database import SessionLocal
+from apps.stock.ingest import ingest_prices
+from apps.stock.models import Stock, StockHistory
+from apps.stock.schema import StockPriceTickSchema
+
+
+def ensure_stocks(count: int) -> list:
+    symbols = [f"BI{n}" for n in range(count)]
+    with SessionLocal() as db:
+        existing = set(
+            db.scalars(select(Stock.symbol).where(Stock.symbol.in_(symbols)))
+        )
+        db.add_all(
+            Stock(symbol=symbol, company_name="Ingest benchmark", price=100)
+            for symbol in symbols
+            if symbol not in existing
+        )
+        db.commit()
+    return symbols
+
+
+def make_ticks(symbols: list, count: int) -> list:
+    # ~1 in 5 ticks repeats the price, which must not write history
+    return [
+        StockPriceTickSchema(
+            symbol=random.choice(symbols), price=random.randint(98, 102)
+        )
+        for _ in range(count)
+    ]
+
+
+def one_at_a_time(ticks: list) -> float:
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        for tick in ticks:
+            stock = db.query(Stock).filter(Stock.symbol == tick.symbol).first()
+            if stock.price != tick.price:
+                db.add(StockHistory(stock_id=stock.id, price=tick.price))
+                stock.price = tick.price
+            db.commit()
+    return time.perf_counter() - started
+
+
+def bulk(ticks: list, batch_size: int) -> float:
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        for start in range(0, len(ticks), batch_size):
+            ingest_prices(db, ticks[start : start + batch_size])
+    return time.perf_counter() - started
+
+
+def main(args):
+    symbols = ensure_stocks(args.stocks)
+    ticks = make_ticks(symbols, args.ticks)
+    single = ticks[: args.single_ticks]
+
+    elapsed = one_at_a_time(single)
+    print(
+        f"one at a time: {len(single) / elapsed:>10.0f} ticks/s ({len(single)} ticks)"
+    )
+    elapsed = bulk(ticks, args.batch)
+    print(
+        f"bulk (batch {args.batch}): {len(ticks) / elapsed:>10.0f} ticks/s "
+        f"({len(ticks)} ticks)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stocks", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=50_000)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument(
+        "--single-ticks", type=int, default=2000, help="ticks for the slow path"
+    )
+    main(parser.parse_args())
@@ -1,25 +1,66 @@
+from contextlib import asynccontextmanager
+
 from fastapi import APIRouter, FastAPI
 
 from apps.api_logs.middleware import APILoggingMiddleware
 from apps.api_logs.route import router as api_logs_router
+from apps.api_logs.sink import api_log_sink
+from apps.authentication.async_auth_routes import router as async_auth_router
 from apps.authentication.auth_routes import router as auth_router
+from apps.authentication.hashing import password_hasher
 from apps.authentication.user_routes import router as user_router
 from apps.blog.route import router as blog_router
+from apps.database import async_engine
+from apps.metrics.profiling import ProfilingMiddleware
+from apps.metrics.route import router as metrics_router
+from apps.notification.hub import notification_hub
+from apps.notification.route import router as notification_router
+from apps.stock.async_route import router as async_stock_router
 from apps.stock.route import router as stock_router
+from base.openapi import install_openapi
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await api_log_sink.start()
+    await notification_hub.start()
+    try:
+        yield
+    finally:
+        await notification_hub.stop()  # closes open notification streams
+        await api_log_sink.stop()  # flush queued API/error logs before exit
+        await async_engine.dispose()
+        password_hasher.shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(APILoggingMiddleware)
+app.add_middleware(ProfilingMiddleware)  # outermost: ?__profile=1 sees the logger too
 v1_router = APIRouter(prefix="/api/v1")
 v1_router.include_router(api_logs_router, prefix="/api-logs", tags=["API Logs"])
 v1_router.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 v1_router.include_router(user_router, prefix="/users", tags=["Users"])
 v1_router.include_router(blog_router, prefix="/blog", tags=["Blog"])
 v1_router.include_router(stock_router, prefix="/stocks", tags=["Stocks"])
+v1_router.include_router(
+    notification_router, prefix="/notifications", tags=["Notifications"]
+)
+v1_router.include_router(
+    metrics_router,
+    prefix="/internal/metrics",
+    tags=["Internal"],
+    include_in_schema=False,
+)
 
-# v2_router = APIRouter(prefix="/api/v2")
-# v2_router.include_router(auth_router, prefix="/auth", tags=["v2-auth"])
+# v2 serves the AsyncSession variants of the hot endpoints
+v2_router = APIRouter(prefix="/api/v2")
+v2_router.include_router(async_auth_router, prefix="/auth", tags=["v2-auth"])
+v2_router.include_router(async_stock_router, prefix="/stocks", tags=["v2-stocks"])
 # v2_router.include_router(blog_router, prefix="/blog", tags=["v2-blog"])
 
 
 app.include_router(v1_router)
-# app.include_router(v2_router)
+app.include_router(v2_router)
+
+# serve the document built by `python -m base.openapi` (OPENAPI_SCHEMA_PATH)
+install_openapi(app)
@@ -0,0 +1,120 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a throwaway SQLite file
+# and turn the query guard on (strict) before anything imports apps.*
+_db_dir = tempfile.mkdtemp(prefix="fast-api-blog-tests-")
+os.environ["DATABASE_URL_"] = f"sqlite:///{_db_dir}/test.db"
+os.environ["ASYNC_DATABASE_URL_"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+os.environ["SECRET_KEY"] = "test-secret-key"
+os.environ["OPENAPI_SCHEMA_PATH"] = ""
+os.environ["QUERY_GUARD_ENABLED"] = "True"
+os.environ["QUERY_GUARD_STRICT"] = "True"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    from apps.database import Base, engine
+
+    Base.metadata.create_all(engine)
+    return main.app
+
+
+def _reset_state():
+    from apps.authentication.login_throttle import login_throttle
+    from apps.authentication.permission_cache import permission_cache
+    from apps.authentication.token_store import InMemoryTokenStore, set_token_store
+    from apps.stock.ingest import symbol_cache
+    from base.cache import response_cache
+    from base.count import count_cache
+
+    permission_cache.invalidate_all()
+    set_token_store(InMemoryTokenStore())
+    login_throttle._data.clear()
+    symbol_cache.invalidate()
+    response_cache.clear()
+    count_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clean_db(app):
+    from apps.database import Base, engine
+
+    _reset_state()
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    _reset_state()
+
+
+@pytest.fixture
+def db(app):
+    from apps.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(app):
+    from apps.api_logs.sink import api_log_sink
+
+    # keep API log batches out of the statements the tests count: they are
+    # written when the client shuts the app down
+    flush_interval = api_log_sink.flush_interval
+    api_log_sink.flush_interval = 3600
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        api_log_sink.flush_interval = flush_interval
+
+
+@pytest.fixture
+def make_user(db):
+    from apps.authentication.models import CustomPermission, User
+    from apps.authentication.utils import hash_password
+
+    def make_user(
+        username: str = "alice",
+        password: str = "secret-password",
+        permissions=(),
+        is_superuser: bool = False,
+    ) -> User:
+        user = User(
+            username=username,
+            email=f"{username}@example.com",
+            hashed_password=hash_password(password),
+            is_active=True,
+            is_superuser=is_superuser,
+        )
+        for code_name in permissions:
+            permission = (
+                db.query(CustomPermission).filter_by(code_name=code_name).first()
+            ) or CustomPermission(name=code_name, code_name=code_name)
+            user.user_permissions.append(permission)
+        db.add(user)
+        db.commit()
+        return user
+
+    return make_user
+
+
+@pytest.fixture
+def auth_headers(db):
+    from apps.authentication.authentication import create_access_token, token_claims
+    from apps.authentication.permission_cache import get_user_permissions
+
+    def auth_headers(user) -> dict:
+        token = create_access_token(token_claims(get_user_permissions(db, user.id)))
+        return {"Authorization": f"Bearer {token}"}
+
+    return auth_headers
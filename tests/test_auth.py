@@ -0,0 +1,92 @@
+import pytest
+
+from apps.authentication import authentication
+from apps.metrics.queries import assert_max_queries
+
+PASSWORD = "secret-password"
+GUARDED_URL = "/api/v1/stocks/retrieve/999"  # can_view_stock, then 404
+
+
+@pytest.fixture
+def stateless(monkeypatch):
+    monkeypatch.setattr(authentication, "JWT_STATELESS_AUTH", True)
+
+
+def login(client, username="alice"):
+    response = client.post(
+        "/api/v1/auth/login", json={"username": username, "password": PASSWORD}
+    )
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+
+def test_logout_revokes_the_access_token(client, make_user):
+    make_user()
+    headers = login(client)
+    assert client.get("/api/v1/auth/profile", headers=headers).status_code == 200
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+    assert client.get("/api/v1/auth/profile", headers=headers).status_code == 401
+    # a new login is unaffected
+    assert client.get("/api/v1/auth/profile", headers=login(client)).status_code == 200
+
+
+def test_deactivation_revokes_every_token(client, db, make_user, stateless):
+    user = make_user(permissions=["can_view_stock"])
+    headers = [login(client), login(client)]
+    user.is_active = False
+    db.commit()
+    for h in headers:
+        assert client.get(GUARDED_URL, headers=h).status_code == 401
+        assert (
+            client.get("/api/v1/notifications/unread-count", headers=h).status_code
+            == 401
+        )
+
+
+def test_malformed_token_is_unauthorized(client):
+    headers = {"Authorization": "Bearer not-a-jwt"}
+    assert client.get("/api/v1/auth/profile", headers=headers).status_code == 401
+
+
+def test_stateless_permission_check_without_queries(
+    client, make_user, auth_headers, stateless
+):
+    headers = auth_headers(make_user(permissions=["can_view_stock"]))
+    with assert_max_queries(1):  # the stock lookup only
+        assert client.get(GUARDED_URL, headers=headers).status_code == 404
+
+
+def test_stateless_identity_without_the_permission_cache(
+    client, make_user, auth_headers, stateless
+):
+    from apps.authentication.permission_cache import permission_cache
+
+    headers = auth_headers(make_user())
+    permission_cache.invalidate_all()
+    with assert_max_queries(0):
+        assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+
+
+@pytest.mark.parametrize("version", ["v1", "v2"])
+def test_stateless_token_with_outdated_permissions_is_rejected(
+    client, db, make_user, auth_headers, stateless, version
+):
+    from apps.authentication.models import CustomPermission
+
+    user = make_user(permissions=["can_view_stock"])
+    headers = auth_headers(user)
+    user.user_permissions.append(
+        CustomPermission(name="can_edit_stock", code_name="can_edit_stock")
+    )
+    db.commit()
+    url = f"/api/{version}/stocks/retrieve/999"
+    response = client.get(url, headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token is outdated"
+    assert client.get(url, headers=auth_headers(user)).status_code == 404
+
+
+def test_missing_permission_is_forbidden(client, make_user, auth_headers):
+    headers = auth_headers(make_user())
+    response = client.get(GUARDED_URL, headers=headers)
+    assert response.status_code == 403
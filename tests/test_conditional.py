@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from apps.metrics.queries import assert_max_queries
+from base.cache import response_cache
+from base.conditional import http_date
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    # exercise the endpoints' own validators, not the response cache
+    monkeypatch.setattr(response_cache, "enabled", False)
+
+
+@pytest.fixture
+def post(db, make_user):
+    from apps.blog.models import Post
+
+    post = Post(title="t", content="c", author_id=make_user("author").id)
+    db.add(post)
+    db.commit()
+    return post
+
+
+def test_retrieve_sends_validators(client, post):
+    response = client.get(f"/api/v1/blog/posts/retrieve/{post.id}")
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('W/"')
+    assert "Last-Modified" in response.headers
+
+
+def test_if_none_match_is_answered_from_the_validator_query(client, post):
+    url = f"/api/v1/blog/posts/retrieve/{post.id}"
+    etag = client.get(url).headers["ETag"]
+    with assert_max_queries(1):
+        response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    # strong form of the same tag, lists and "*" match too
+    for header in [etag.removeprefix("W/"), f'"other", {etag}', "*"]:
+        assert client.get(url, headers={"If-None-Match": header}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_update_changes_the_etag(client, db, post):
+    url = f"/api/v1/blog/posts/retrieve/{post.id}"
+    etag = client.get(url).headers["ETag"]
+    post.title = "new"
+    post.updated_at = datetime.now(timezone.utc) + timedelta(seconds=5)
+    db.commit()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["data"]["title"] == "new"
+
+
+def test_if_modified_since(client, post):
+    url = f"/api/v1/blog/posts/retrieve/{post.id}"
+    last_modified = client.get(url).headers["Last-Modified"]
+    assert (
+        client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    )
+    earlier = http_date(datetime.now(timezone.utc) - timedelta(days=1))
+    assert client.get(url, headers={"If-Modified-Since": earlier}).status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    response = client.get(
+        url, headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 200
+
+
+def test_missing_row_is_404(client):
+    assert client.get("/api/v1/blog/posts/retrieve/999").status_code == 404
+
+
+def test_list_etag_follows_inserts_and_query_string(client, db, post):
+    from apps.blog.models import Post
+
+    url = "/api/v1/blog/posts/list"
+    # a plain GET skips the collection state query: its ETag is the page's
+    with assert_max_queries(2):  # count, page
+        page_etag = client.get(url).headers["ETag"]
+    assert client.get(url + "?page_size=5").headers["ETag"] != page_etag
+    # unchanged page: 304 with the state ETag, which the next request sends
+    response = client.get(url, headers={"If-None-Match": page_etag})
+    assert response.status_code == 304
+    etag = response.headers["ETag"]
+    assert etag != page_etag
+    with assert_max_queries(1):
+        response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    db.add(Post(title="t2", content="c", author_id=post.author_id))
+    db.commit()
+    response = client.get("/api/v1/blog/posts/list", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_stock_etag_follows_new_history(client, db, make_user, auth_headers):
+    from apps.stock.models import Stock, StockHistory
+
+    stock = Stock(symbol="ACME", company_name="Acme", price=1)
+    db.add(stock)
+    db.commit()
+    headers = auth_headers(make_user(permissions=["can_view_stock"]))
+    url = f"/api/v1/stocks/retrieve/{stock.id}"
+    etag = client.get(url, headers=headers).headers["ETag"]
+    not_modified = {**headers, "If-None-Match": etag}
+    assert client.get(url, headers=not_modified).status_code == 304
+
+    db.add(StockHistory(stock_id=stock.id, price=2))
+    db.commit()
+    assert client.get(url, headers=not_modified).status_code == 200
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import event, text
+
+from base import count
+from base.count import CountStrategy, count_cache, count_query
+
+
+@pytest.fixture
+def stocks(db):
+    from apps.stock.models import Stock
+
+    db.add_all(
+        Stock(symbol=f"S{i}", company_name=f"Stock {i}", price=1) for i in range(3)
+    )
+    db.commit()
+
+
+def test_failed_estimate_falls_back_in_a_usable_transaction(db, stocks, monkeypatch):
+    from apps.stock.models import Stock
+
+    def broken_estimate(db, statement):
+        db.execute(text("SELECT * FROM no_such_table"))
+
+    monkeypatch.setattr(db.bind.dialect, "name", "postgresql")
+    monkeypatch.setattr(count, "_planner_estimate", broken_estimate)
+    statements = []
+    engine = db.get_bind()
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        total = count_query(db.query(Stock), CountStrategy.ESTIMATED)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # Postgres aborts the transaction on the failed lookup: the exact count
+    # only works because the savepoint was rolled back first
+    assert any(s.startswith("ROLLBACK TO SAVEPOINT") for s in statements)
+    assert total == (3, CountStrategy.EXACT)
+
+
+def test_cached_count_is_reused(db, stocks):
+    from apps.stock.models import Stock
+
+    assert count_query(db.query(Stock), CountStrategy.CACHED)[0] == 3
+    db.add(Stock(symbol="NEW", company_name="New", price=1))
+    db.commit()
+    assert count_query(db.query(Stock), CountStrategy.CACHED)[0] == 3
+    count_cache.clear()
+    assert count_query(db.query(Stock), CountStrategy.CACHED)[0] == 4
+
+
+def test_cached_count_is_dropped_with_its_table(db, stocks):
+    from apps.stock.models import Stock
+
+    assert count_query(db.query(Stock), CountStrategy.CACHED)[0] == 3
+    db.add(Stock(symbol="NEW", company_name="New", price=1))
+    db.commit()
+    count_cache.invalidate_tables("posts")
+    assert count_query(db.query(Stock), CountStrategy.CACHED)[0] == 3
+    count_cache.invalidate_tables(Stock.__tablename__)
+    assert count_query(db.query(Stock), CountStrategy.CACHED)[0] == 4
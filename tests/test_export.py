@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from base.export import ExportFormat, iter_export
+
+
+@pytest.fixture
+def history(db):
+    from apps.stock.models import Stock, StockHistory
+
+    acme = Stock(symbol="ACME", company_name="Acme", price=1)
+    other = Stock(symbol="OTHER", company_name="Other", price=1)
+    db.add_all([acme, other])
+    db.flush()
+    db.add_all(
+        StockHistory(stock_id=acme.id, price=day, created_at=datetime(2026, 10, day))
+        for day in (3, 1, 2)
+    )
+    db.add(StockHistory(stock_id=other.id, price=50, created_at=datetime(2026, 10, 1)))
+    db.commit()
+    return acme.id
+
+
+@pytest.fixture
+def viewer_headers(make_user, auth_headers):
+    return auth_headers(make_user("viewer", permissions=["can_view_stock"]))
+
+
+def test_csv_export_streams_oldest_first(client, history, viewer_headers):
+    response = client.get(
+        f"/api/v1/stocks/history/export?stock_id={history}", headers=viewer_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert (
+        response.headers["content-disposition"]
+        == 'attachment; filename="stock_history.csv"'
+    )
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["stock_id", "price", "created_at"]
+    assert [int(row[1]) for row in rows[1:]] == [1, 2, 3]
+
+
+def test_ndjson_export_with_a_date_range(client, history, viewer_headers):
+    response = client.get(
+        "/api/v1/stocks/history/export?format=ndjson"
+        "&from=2026-10-01T00:00:00&to=2026-10-03T00:00:00",
+        headers=viewer_headers,
+    )
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["price"] for line in lines) == [1, 2, 50]
+    assert lines[0]["created_at"].startswith("2026-10-01")
+
+
+def test_export_requires_the_permission(client, history, make_user, auth_headers):
+    headers = auth_headers(make_user("nobody"))
+    response = client.get("/api/v1/stocks/history/export", headers=headers)
+    assert response.status_code == 403
+
+
+def test_chunks_follow_yield_per(history):
+    from apps.stock.models import StockHistory
+
+    query = select(StockHistory.price).order_by(StockHistory.id)
+    chunks = list(iter_export(query, ExportFormat.NDJSON, yield_per=2))
+    assert [len(chunk.splitlines()) for chunk in chunks] == [2, 2]
+    csv_chunks = list(iter_export(query, ExportFormat.CSV, yield_per=3))
+    assert [len(chunk.splitlines()) for chunk in csv_chunks] == [4, 1]  # + header
+
+
+def test_empty_csv_export_has_the_header(db):
+    from apps.stock.models import StockHistory
+
+    chunks = list(iter_export(select(StockHistory.price), ExportFormat.CSV))
+    assert chunks == ["price\r\n"]
+    assert list(iter_export(select(StockHistory.price), ExportFormat.NDJSON)) == []
+
+
+def test_api_log_export_is_superuser_only(client, make_user, auth_headers):
+    url = "/api/v1/api-logs/export?format=csv"
+    user = auth_headers(make_user("user"))
+    admin = auth_headers(make_user("admin", is_superuser=True))
+    assert client.get(url, headers=user).status_code == 403
+    response = client.get(url, headers=admin)
+    assert response.status_code == 200
+    assert response.text.splitlines()[0].startswith("id,")
@@ -0,0 +1,73 @@
+import pytest
+from fastapi import BackgroundTasks
+
+from apps.notification import service
+from apps.notification.models import NotificationTypeChoices
+
+
+@pytest.fixture
+def broadcast_new_stock(monkeypatch):
+    monkeypatch.setattr(service, "BROADCAST_TYPES", {NotificationTypeChoices.NEW_STOCK})
+
+
+def broadcast(db, count):
+    from apps.notification.schemas import NotificationCreateSchema
+    from apps.notification.service import create_notification_for_all_users
+
+    for i in range(count):
+        create_notification_for_all_users(
+            db,
+            NotificationCreateSchema(
+                title=f"n{i}", message="m", notification_type="new_stock"
+            ),
+            BackgroundTasks(),
+        )
+    db.commit()
+
+
+def test_list_walks_every_page_by_cursor(
+    client, db, make_user, auth_headers, broadcast_new_stock
+):
+    headers = auth_headers(make_user())
+    broadcast(db, 25)
+    titles, after = [], None
+    while True:
+        url = "/api/v1/notifications/list" + (f"?after={after}" if after else "")
+        body = client.get(url, headers=headers).json()
+        assert "total" not in body["meta"]
+        titles.extend(item["title"] for item in body["data"])
+        after = body["meta"]["next_cursor"]
+        if after is None:
+            break
+    assert titles == [f"n{i}" for i in reversed(range(25))]
+
+
+def test_list_offset_mode_is_opt_in(
+    client, db, make_user, auth_headers, broadcast_new_stock
+):
+    headers = auth_headers(make_user())
+    broadcast(db, 3)
+    body = client.get(
+        "/api/v1/notifications/list?cursor=false&is_read=false", headers=headers
+    ).json()
+    assert body["meta"]["total"] == 3
+    assert body["meta"]["page"] == 1
+
+
+def test_create_stock_fans_out_on_write(client, db, make_user, auth_headers):
+    from apps.notification.models import Notification, UserNotification
+
+    users = [make_user("alice"), make_user("bob")]
+    response = client.post(
+        "/api/v1/stocks/create",
+        json={"symbol": "ACME", "company_name": "Acme", "price": 10},
+    )
+    assert response.status_code == 201
+    # the background task ran after the response: one row per active user
+    notification = db.query(Notification).one()
+    assert not notification.is_broadcast
+    assert db.query(UserNotification).count() == len(users)
+    body = client.get(
+        "/api/v1/notifications/list", headers=auth_headers(users[0])
+    ).json()
+    assert [item["title"] for item in body["data"]] == ["New Stock Added-ACME"]
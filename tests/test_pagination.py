@@ -0,0 +1,125 @@
+import asyncio
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from base.count import CountStrategy
+from base.pagination import (
+    PaginationParams,
+    decode_cursor,
+    encode_cursor,
+    paginate_async,
+)
+
+
+@pytest.fixture
+def stocks(db):
+    from apps.stock.models import Stock
+
+    db.add_all(
+        Stock(symbol=f"S{i}", company_name=f"Stock {i}", price=i) for i in range(23)
+    )
+    db.commit()
+
+
+def walk(client, url):
+    """Every item of a cursor paginated list, following next_cursor"""
+    items, pages, after = [], 0, None
+    while True:
+        separator = "&" if "?" in url else "?"
+        response = client.get(url + (f"{separator}after={after}" if after else ""))
+        assert response.status_code == 200
+        body = response.json()
+        items.extend(body["data"])
+        pages += 1
+        assert body["meta"]["has_more"] is (body["meta"]["next_cursor"] is not None)
+        after = body["meta"]["next_cursor"]
+        if after is None:
+            return items, pages
+
+
+def test_stock_list_cursor_walk(client, stocks):
+    items, pages = walk(client, "/api/v1/stocks/list?cursor=true&page_size=10")
+    assert [item["symbol"] for item in items] == [f"S{i}" for i in range(23)]
+    assert pages == 3
+
+
+def test_cursor_pages_skip_rows_inserted_before_the_cursor(client, db, stocks):
+    from apps.stock.models import Stock
+
+    first = client.get("/api/v1/stocks/list?cursor=true&page_size=10").json()
+    db.query(Stock).filter(Stock.symbol == "S0").delete()
+    db.commit()
+    second = client.get(
+        f"/api/v1/stocks/list?page_size=10&after={first['meta']['next_cursor']}"
+    ).json()
+    # offset pagination would have shifted S10 onto the first page
+    assert second["data"][0]["symbol"] == "S10"
+
+
+def test_post_list_cursor_walk(client, make_user, db):
+    from apps.blog.models import Post
+
+    author = make_user("author")
+    db.add_all(Post(title=f"t{i}", content="c", author_id=author.id) for i in range(7))
+    db.commit()
+    items, pages = walk(client, "/api/v1/blog/posts/list?cursor=true&page_size=3")
+    assert [item["title"] for item in items] == [f"t{i}" for i in range(7)]
+    assert pages == 3
+
+
+def test_offset_mode_keeps_totals(client, stocks):
+    meta = client.get("/api/v1/stocks/list?page=3&page_size=10").json()["meta"]
+    assert (meta["total"], meta["total_pages"], meta["next_page"]) == (23, 3, None)
+
+
+@pytest.mark.parametrize("after", ["garbage", "W10=", "WzEsMl0"])  # [] and [1,2]
+def test_invalid_cursor(client, stocks, after):
+    response = client.get(f"/api/v1/stocks/list?after={after}")
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [datetime(2026, 10, 1, 9, 30), 7],
+        [date(2026, 10, 1), "x"],
+        [Decimal("12.50"), None],
+    ],
+)
+def test_cursor_round_trips_sort_key_types(values):
+    assert decode_cursor(encode_cursor(values), len(values)) == values
+
+
+def test_cursor_rejects_keys_it_cannot_encode():
+    with pytest.raises(TypeError, match="UUID"):
+        encode_cursor([uuid.uuid4()])
+
+
+def test_paginate_async_count_strategy(db, stocks):
+    from apps.database import AsyncSessionLocal
+    from apps.stock.models import Stock
+    from apps.stock.schema import StockListSchema
+
+    async def page(strategy):
+        async with AsyncSessionLocal() as session:
+            return await paginate_async(
+                db=session,
+                query=select(Stock).order_by(Stock.id),
+                pagination=PaginationParams(page=3, page_size=10),
+                schema=StockListSchema,
+                count_strategy=strategy,
+            )
+
+    result = asyncio.run(page(CountStrategy.CACHED))
+    assert len(result.data) == 3
+    assert result.meta["total"] == 23
+    assert result.meta["count_strategy"] == "cached"  # JSON-ready meta
+    # a cached total is reused until it expires or its table is invalidated
+    db.add(Stock(symbol="NEW", company_name="New", price=1))
+    db.commit()
+    assert asyncio.run(page(CountStrategy.CACHED)).meta["total"] == 23
+    assert asyncio.run(page(CountStrategy.EXACT)).meta["total"] == 24
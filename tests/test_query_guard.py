@@ -0,0 +1,162 @@
+import pytest
+
+from apps.authentication.permission_cache import permission_cache
+from apps.metrics.queries import QueryBudgetExceeded, assert_max_queries
+from apps.metrics.timing import _current, start_request_timing
+
+PASSWORD = "secret-password"
+
+
+@pytest.fixture
+def stocks(db):
+    from apps.stock.models import Stock
+
+    db.add_all(
+        Stock(symbol=f"S{i}", company_name=f"Stock {i}", price=10 + i)
+        for i in range(15)
+    )
+    db.commit()
+
+
+@pytest.fixture
+def posts(db, make_user):
+    from apps.blog.models import Post
+
+    author = make_user("author")
+    db.add_all(Post(title=f"t{i}", content="c", author_id=author.id) for i in range(15))
+    db.commit()
+    return author
+
+
+@pytest.mark.parametrize("url", ["/api/v1/auth/login", "/api/v2/auth/login"])
+def test_login_queries(client, make_user, url):
+    credentials = {"username": "alice", "password": PASSWORD}
+    make_user(credentials["username"], permissions=["can_view_stock"])
+    permission_cache.invalidate_all()
+    # user + roles + permissions, then the permission cache miss (2)
+    with assert_max_queries(5):
+        response = client.post(url, json=credentials)
+    assert response.status_code == 200
+    assert response.json()["data"]["permissions"] == ["can_view_stock"]
+
+
+@pytest.mark.parametrize("url", ["/api/v1/auth/profile", "/api/v2/auth/profile"])
+def test_profile_queries(client, make_user, auth_headers, posts, url):
+    headers = auth_headers(posts)
+    with assert_max_queries(2):  # user, posts
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["data"]["posts"]) == 15
+
+
+@pytest.mark.parametrize("url", ["/api/v1/stocks/list", "/api/v2/stocks/list"])
+def test_stock_list_queries(client, stocks, url):
+    with assert_max_queries(2):  # count, page
+        response = client.get(url)
+    assert response.status_code == 200
+    assert len(response.json()["data"]) == 10
+
+
+def test_stock_list_cursor_queries(client, stocks):
+    with assert_max_queries(1):  # no count in cursor mode
+        response = client.get("/api/v1/stocks/list?cursor=true")
+    assert response.status_code == 200
+
+
+def test_post_list_queries(client, posts):
+    with assert_max_queries(2):  # count, page
+        response = client.get("/api/v1/blog/posts/list")
+    assert response.status_code == 200
+    assert len(response.json()["data"]) == 10
+
+
+def test_notification_list_queries(client, db, make_user, auth_headers, monkeypatch):
+    from fastapi import BackgroundTasks
+
+    from apps.notification import service
+    from apps.notification.models import NotificationTypeChoices
+    from apps.notification.schemas import NotificationCreateSchema
+    from apps.notification.service import create_notification_for_all_users
+
+    # broadcasts: the page is a union with the user's own rows
+    monkeypatch.setattr(service, "BROADCAST_TYPES", {NotificationTypeChoices.NEW_STOCK})
+    user = make_user()
+    for i in range(12):
+        create_notification_for_all_users(
+            db,
+            NotificationCreateSchema(
+                title=f"n{i}", message="m", notification_type="new_stock"
+            ),
+            BackgroundTasks(),
+        )
+    db.commit()
+    headers = auth_headers(user)
+    with assert_max_queries(1):  # cursor by default: no count over the union
+        response = client.get("/api/v1/notifications/list", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["data"]) == 10
+    assert response.json()["meta"]["has_more"] is True
+
+    with assert_max_queries(2):  # count, page
+        response = client.get(
+            "/api/v1/notifications/list?cursor=false&page=2", headers=headers
+        )
+    assert response.status_code == 200
+    assert response.json()["meta"]["total"] == 12
+    assert len(response.json()["data"]) == 2
+
+
+def test_assert_max_queries_reports_statements(db, stocks):
+    from apps.stock.models import Stock
+
+    with pytest.raises(QueryBudgetExceeded, match="2 statements, expected at most 1"):
+        with assert_max_queries(1):
+            db.query(Stock).count()
+            db.query(Stock).first()
+
+
+def test_strict_budget_fails_the_request(client, make_user, auth_headers, monkeypatch):
+    from apps.authentication import auth_routes
+
+    headers = auth_headers(make_user())
+    monkeypatch.setattr(auth_routes.get_me, "query_budget", 1)
+    with pytest.raises(QueryBudgetExceeded, match=r"auth_routes\.get_me"):
+        client.get("/api/v1/auth/profile", headers=headers)
+
+
+def test_repeated_relationship_loads_are_reported(db, make_user):
+    from apps.authentication.models import User
+
+    for name in ("u1", "u2", "u3"):
+        make_user(name)
+    db.expire_all()
+    token = _current.set(None)
+    try:
+        timings = start_request_timing()
+        for user in db.query(User).all():
+            list(user.posts)  # one lazy load per user
+    finally:
+        _current.reset(token)
+    (entry,) = timings.queries.summary()["repeated"]
+    assert entry["count"] == 3
+    assert entry["relationships"] == ["User.posts"]
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/v1/stocks/list",
+        "/api/v2/stocks/list",
+        "/api/v1/blog/posts/list",
+        "/api/v1/notifications/list",
+    ],
+)
+def test_list_endpoints_have_their_own_budget(
+    client, make_user, auth_headers, stocks, posts, monkeypatch, url
+):
+    from apps.metrics import queries
+
+    headers = auth_headers(make_user())
+    # the default only applies to endpoints without @query_budget
+    monkeypatch.setattr(queries, "QUERY_GUARD_DEFAULT_BUDGET", 1)
+    assert client.get(url, headers=headers).status_code == 200
@@ -0,0 +1,126 @@
+import pytest
+
+from apps.metrics.queries import assert_max_queries
+from base.cache import response_cache
+
+
+@pytest.fixture
+def stocks(db):
+    from apps.stock.models import Stock
+
+    stocks = [
+        Stock(symbol=f"S{i}", company_name=f"Stock {i}", price=i) for i in range(3)
+    ]
+    db.add_all(stocks)
+    db.commit()
+    return [stock.id for stock in stocks]
+
+
+@pytest.fixture
+def viewer_headers(make_user, auth_headers):
+    return auth_headers(make_user("viewer", permissions=["can_view_stock"]))
+
+
+def test_second_read_is_served_from_the_cache(client, stocks):
+    first = client.get("/api/v1/stocks/list")
+    assert first.headers["X-Cache"] == "MISS"
+    with assert_max_queries(0):
+        second = client.get("/api/v1/stocks/list")
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.content == first.content
+
+
+def test_if_none_match_answers_304(client, stocks):
+    etag = client.get("/api/v1/stocks/list").headers["ETag"]
+    with assert_max_queries(0):
+        response = client.get("/api/v1/stocks/list", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_query_string_is_part_of_the_key(client, stocks):
+    client.get("/api/v1/stocks/list?page_size=1")
+    response = client.get("/api/v1/stocks/list?page_size=2")
+    assert response.headers["X-Cache"] == "MISS"
+    assert len(response.json()["data"]) == 2
+
+
+def test_update_invalidates_the_list_and_that_stock_only(
+    client, stocks, viewer_headers
+):
+    updated, other = stocks[0], stocks[1]
+    list_etag = client.get("/api/v1/stocks/list").headers["ETag"]
+    for stock_id in stocks[:2]:
+        client.get(f"/api/v1/stocks/retrieve/{stock_id}", headers=viewer_headers)
+
+    response = client.patch(f"/api/v1/stocks/update/{updated}", json={"price": 99})
+    assert response.status_code == 200
+
+    listed = client.get("/api/v1/stocks/list")
+    assert listed.headers["X-Cache"] == "MISS"
+    assert listed.headers["ETag"] != list_etag
+    assert listed.json()["data"][0]["price"] == 99
+    url = "/api/v1/stocks/retrieve/{}"
+    response = client.get(url.format(updated), headers=viewer_headers)
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.json()["data"]["price"] == 99
+    response = client.get(url.format(other), headers=viewer_headers)
+    assert response.headers["X-Cache"] == "HIT"
+
+
+def test_create_invalidates_the_list(client, stocks):
+    client.get("/api/v1/stocks/list")
+    response = client.post(
+        "/api/v1/stocks/create",
+        json={"symbol": "NEW", "company_name": "New", "price": 5},
+    )
+    assert response.status_code == 201
+    listed = client.get("/api/v1/stocks/list")
+    assert listed.headers["X-Cache"] == "MISS"
+    assert listed.json()["meta"]["total"] == 4
+
+
+def test_entries_are_scoped_by_permissions(client, make_user, auth_headers, stocks):
+    url = f"/api/v1/stocks/retrieve/{stocks[0]}"
+    viewer = auth_headers(make_user("viewer", permissions=["can_view_stock"]))
+    editor = auth_headers(
+        make_user("editor", permissions=["can_view_stock", "can_edit_stock"])
+    )
+    assert client.get(url, headers=viewer).headers["X-Cache"] == "MISS"
+    assert client.get(url, headers=editor).headers["X-Cache"] == "MISS"
+    assert client.get(url, headers=viewer).headers["X-Cache"] == "HIT"
+
+
+def test_permission_checks_run_on_cache_hits(client, make_user, auth_headers, stocks):
+    url = f"/api/v1/stocks/retrieve/{stocks[0]}"
+    viewer = auth_headers(make_user("viewer", permissions=["can_view_stock"]))
+    client.get(url, headers=viewer)
+    assert client.get(url).status_code in (401, 403)
+    assert client.get(url, headers=auth_headers(make_user("nobody"))).status_code == 403
+
+
+def test_post_create_invalidates_the_post_list(client, make_user):
+    author = make_user("author")
+    url = "/api/v1/blog/posts/list?page_size=1"
+    body = client.get(url).json()
+    assert body["data"] == []
+    assert body["meta"]["total"] == 0
+    for title in ("a", "b"):
+        response = client.post(
+            "/api/v1/blog/posts/create",
+            json={"title": title, "content": "c", "author_id": author.id},
+        )
+        assert response.status_code == 200
+    # the CACHED count is dropped along with the response
+    body = client.get(url).json()
+    assert len(body["data"]) == 1
+    assert body["meta"]["total"] == 2
+    assert body["meta"]["next_page"] == 2
+
+
+def test_disabled_cache_always_calls_the_endpoint(client, stocks, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", False)
+    client.get("/api/v1/stocks/list")
+    assert "X-Cache" not in client.get("/api/v1/stocks/list").headers
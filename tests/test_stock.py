@@ -0,0 +1,212 @@
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def stock(db):
+    from apps.stock.models import Stock, StockHistory
+
+    stock = Stock(symbol="ACME", company_name="Acme", price=10)
+    db.add(stock)
+    db.flush()
+    db.add_all(
+        StockHistory(
+            stock_id=stock.id, price=price, created_at=datetime(2026, 10, 1, hour)
+        )
+        for hour, price in [(9, 10), (9, 14), (10, 12), (10, 8), (10, 11)]
+    )
+    db.commit()
+    return stock
+
+
+@pytest.fixture
+def viewer_headers(make_user, auth_headers):
+    return auth_headers(make_user("viewer", permissions=["can_view_stock"]))
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "from=2026-10-01T00:00:00&to=2026-10-02T00:00:00",
+        "from=2026-10-01T00:00:00Z&to=2026-10-02T00:00:00",
+        "from=2026-10-01T00:00:00&to=2026-10-02T00:00:00%2B00:00",
+    ],
+)
+def test_candles_accept_naive_bounds(client, stock, viewer_headers, query):
+    response = client.get(
+        f"/api/v1/stocks/{stock.id}/candles?interval=1h&{query}",
+        headers=viewer_headers,
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["meta"]["from"] == "2026-10-01T00:00:00+00:00"
+    assert [(c["open"], c["high"], c["low"], c["close"]) for c in body["data"]] == [
+        (10, 14, 10, 14),
+        (12, 12, 8, 11),
+    ]
+
+
+def test_candles_naive_from_without_to(client, stock, viewer_headers):
+    response = client.get(
+        f"/api/v1/stocks/{stock.id}/candles?interval=1d&from=2026-10-01T00:00:00",
+        headers=viewer_headers,
+    )
+    assert response.status_code == 200
+
+
+def test_postgres_candle_buckets_are_utc():
+    from sqlalchemy.dialects import postgresql
+
+    from apps.stock.candles import CandleInterval, bucket_expression
+    from apps.stock.models import StockHistory
+
+    bucket = bucket_expression(
+        StockHistory.created_at, CandleInterval.DAY, "postgresql"
+    )
+    sql = bucket.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    assert str(sql) == "date_trunc('day', stock_history.created_at AT TIME ZONE 'UTC')"
+
+
+@pytest.mark.parametrize("version", ["v1", "v2"])
+def test_retrieve_pages_through_history(client, stock, viewer_headers, version):
+    url = f"/api/{version}/stocks/retrieve/{stock.id}?history_limit=2"
+    prices, cursor = [], None
+    while True:
+        response = client.get(
+            url + (f"&history_cursor={cursor}" if cursor else ""),
+            headers=viewer_headers,
+        )
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert len(data["history"]) <= 2
+        prices.extend(row["price"] for row in data["history"])
+        cursor = data["history_next_cursor"]
+        if cursor is None:
+            break
+    assert prices == [11, 8, 12, 14, 10]
+
+
+@pytest.mark.parametrize("version", ["v1", "v2"])
+def test_retrieve_history_since(client, stock, viewer_headers, version):
+    response = client.get(
+        f"/api/{version}/stocks/retrieve/{stock.id}?history_since=2026-10-01T10:00:00",
+        headers=viewer_headers,
+    )
+    assert [row["price"] for row in response.json()["data"]["history"]] == [11, 8, 12]
+
+
+@pytest.mark.parametrize("version", ["v1", "v2"])
+def test_retrieve_rejects_a_bad_history_cursor(client, stock, viewer_headers, version):
+    response = client.get(
+        f"/api/{version}/stocks/retrieve/{stock.id}?history_cursor=garbage",
+        headers=viewer_headers,
+    )
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def editor_headers(make_user, auth_headers):
+    return auth_headers(make_user("editor", permissions=["can_edit_stock"]))
+
+
+def test_bulk_prices_json(client, db, stock, editor_headers):
+    from apps.stock.models import Stock, StockHistory
+
+    ticks = [
+        {"symbol": "ACME", "price": 20, "ts": "2026-10-02T10:00:00Z"},
+        {"symbol": "ACME", "price": 20, "ts": "2026-10-02T10:01:00Z"},
+        {"symbol": "ACME", "price": 21, "ts": "2026-10-02T10:02:00+02:00"},
+        {"symbol": "NOPE", "price": 1},
+    ]
+    response = client.post(
+        "/api/v1/stocks/prices/bulk", json=ticks, headers=editor_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == {
+        "received": 4,
+        "updated": 1,
+        "history": 2,
+        "stale": 0,
+        "unknown_symbols": ["NOPE"],
+    }
+    db.expire_all()
+    acme = db.get(Stock, stock.id)
+    assert acme.price == 20  # the +02:00 tick is the older one
+    # time of the last change, naive like the other writers of last_updated
+    changed_at = datetime.fromisoformat("2026-10-02T10:00:00+00:00").astimezone()
+    assert acme.last_updated == changed_at.replace(tzinfo=None).isoformat()
+    assert db.query(StockHistory).filter_by(stock_id=stock.id).count() == 7
+
+
+def test_bulk_prices_ndjson(client, db, stock, editor_headers):
+    from apps.stock.models import Stock
+
+    body = "\n".join(
+        ['{"symbol": "ACME", "price": 30}', "", '{"symbol": "ACME", "price": 31}']
+    )
+    response = client.post(
+        "/api/v1/stocks/prices/bulk",
+        content=body,
+        headers={**editor_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["data"]["updated"] == 1
+    db.expire_all()
+    assert db.get(Stock, stock.id).price == 31
+
+
+def test_bulk_prices_late_tick_does_not_move_the_price(
+    client, db, stock, editor_headers
+):
+    from apps.stock.models import Stock, StockHistory
+
+    url = "/api/v1/stocks/prices/bulk"
+    newer = [{"symbol": "ACME", "price": 40, "ts": "2026-10-02T10:05:00Z"}]
+    older = [{"symbol": "ACME", "price": 39, "ts": "2026-10-02T10:04:00Z"}]
+    assert (
+        client.post(url, json=newer, headers=editor_headers).json()["data"]["updated"]
+        == 1
+    )
+    data = client.post(url, json=older, headers=editor_headers).json()["data"]
+    assert (data["updated"], data["history"], data["stale"]) == (0, 1, 1)
+    db.expire_all()
+    acme = db.get(Stock, stock.id)
+    assert acme.price == 40
+    changed_at = datetime.fromisoformat("2026-10-02T10:05:00+00:00").astimezone()
+    assert acme.last_updated == changed_at.replace(tzinfo=None).isoformat()
+    # still recorded, at its own time
+    late = db.query(StockHistory).filter_by(stock_id=stock.id, price=39).one()
+    assert late.created_at.replace(tzinfo=None) == datetime(2026, 10, 2, 10, 4)
+
+
+def test_bulk_prices_reports_stocks_deleted_after_caching(
+    client, db, stock, editor_headers
+):
+    from apps.stock.models import Stock, StockHistory
+
+    gone = Stock(symbol="GONE", company_name="Gone", price=1)
+    db.add(gone)
+    db.commit()
+    tick = [{"symbol": "GONE", "price": 2}]
+    response = client.post(
+        "/api/v1/stocks/prices/bulk", json=tick, headers=editor_headers
+    )
+    assert response.json()["data"]["updated"] == 1  # GONE is now in the id cache
+    db.query(StockHistory).filter_by(stock_id=gone.id).delete()
+    db.delete(gone)
+    db.commit()
+    response = client.post(
+        "/api/v1/stocks/prices/bulk", json=tick, headers=editor_headers
+    )
+    assert response.json()["data"]["unknown_symbols"] == ["GONE"]
+
+
+def test_bulk_prices_invalid_tick(client, stock, editor_headers):
+    response = client.post(
+        "/api/v1/stocks/prices/bulk",
+        json=[{"symbol": "ACME", "price": "lots"}],
+        headers=editor_headers,
+    )
+    assert response.status_code == 400